@@ -1,8 +1,56 @@
+import collections
+from concurrent.futures import ThreadPoolExecutor
 import datetime
-import itertools
+import json
+import logging
+import time
+import urllib
 
+import requests
+
+from . import session as _session
+from ..box import metrics
+from ..box import ratelimit
+from ..box import retry
 from ..box.constants import StockCategory
 from ..box.exceptions import DateFormatError
+from ..box.exceptions import HolidayWarning
+from ..box.metrics import METRICS
+from .columnar import ColumnarResult
+
+logger = logging.getLogger(__name__)
+
+# 單一資料來源的請求內容及對應的解析方法 parse(date, resp)
+Route = collections.namedtuple("Route", ["url", "params", "parse"])
+
+
+class RawResponse:
+    """與 requests.Response 相容之最小介面 (url、status_code、content、text、json)，供非 requests 來源使用"""
+
+    def __init__(self, url: str, status_code: int, content: bytes, encoding: str = None):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.encoding = encoding or "utf-8"
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, errors="replace")
+
+    def json(self):
+        return json.loads(self.text)
+
+    @classmethod
+    def from_response(cls, resp):
+        """轉換 requests.Response，未指定編碼時以 apparent_encoding 解碼"""
+        if isinstance(resp, cls):
+            return resp
+        return cls(
+            url=resp.url,
+            status_code=resp.status_code,
+            content=resp.content,
+            encoding=resp.encoding or resp.apparent_encoding,
+        )
 
 
 class BaseFetcher:
@@ -10,6 +58,13 @@ class BaseFetcher:
         "User-agent": "Mozilla/5.0 (Windows NT 6.2; WOW64; rv:33.0) Gecko/20100101 Firefox/33.0",
         "Accept-Encoding": "gzip, deflate, compress",
     }
+    # 每個主機 5 秒內不超過 3 次請求
+    RATE_LIMIT = (3, 5)
+    CLEAN_SEPARATOR = "\x00"
+    # typed 時開高低收之型別，可改為 decimal.Decimal
+    PRICE_TYPE = float
+    # typed 時視為缺值的標記 (clean 後的 "--" 已為 None)
+    EMPTY_VALUES = ("", "-", "--", "X")
 
     def __init__(
         self,
@@ -18,12 +73,37 @@ class BaseFetcher:
         enable_fetch_institutional_investors,
         enable_fetch_credit_transactions_securities,
         sleep_second,
+        session=None,
+        timeout=_session.DEFAULT_TIMEOUT,
+        rate_limit=None,
+        concurrent=False,
+        cache=None,
+        columnar=False,
+        typed=False,
+        retry_policy=None,
     ):
         self._proxy_provider = proxy_provider
         self._enable_fetch_price = enable_fetch_price
         self._enable_fetch_institutional_investors = enable_fetch_institutional_investors
         self._enable_fetch_credit_transactions_securities = enable_fetch_credit_transactions_securities
         self._sleep_second = sleep_second
+        self._session = session
+        self._timeout = timeout
+        self._rate_limit = self.RATE_LIMIT if rate_limit is None else rate_limit
+        self._concurrent = concurrent
+        self._cache = cache
+        self._columnar = columnar
+        self._schemas = dict()
+        self._typed = typed
+        self._column_types = None
+        self._retry_policy = retry.RetryPolicy() if retry_policy is None else retry_policy
+
+    @property
+    def session(self):
+        # 延遲建立，未指定時各 fetcher 自行持有一個連線池
+        if self._session is None:
+            self._session = _session.create_session()
+        return self._session
 
     @property
     def base_columns(self):
@@ -82,6 +162,48 @@ class BaseFetcher:
     def get_proxy(self):
         return self._proxy_provider.get_proxy()
 
+    def report_proxy(self, proxies: dict, **kwargs):
+        """回報 proxy 的請求結果 (latency、status_code 或 error)，見 proxy.provider.ProxyProvider.report"""
+        self._proxy_provider.report(proxies, **kwargs)
+
+    def get_bucket(self, url, proxies=None):
+        capacity, period = self._rate_limit
+        key = urllib.parse.urlparse(url).netloc
+        if proxies:
+            # 來源網站依來源 IP 限制頻率，每個 proxy 各自一份額度
+            key = (key, tuple(sorted(proxies.items())))
+        return ratelimit.get_bucket(key, capacity=capacity, period=period)
+
+    def get(self, url, params):
+        endpoint = metrics.get_endpoint(url)
+        proxies = self.get_proxy()
+        METRICS.observe("ratelimit_wait", self.get_bucket(url, proxies).acquire(), endpoint=endpoint)
+        start = time.monotonic()
+        try:
+            resp = self.session.get(
+                url=url,
+                params=params,
+                proxies=proxies,
+                headers=self.HEADERS,
+                timeout=self._timeout,
+            )
+        except requests.exceptions.RequestException as e:
+            self.report_proxy(proxies, error=e)
+            METRICS.increment("request_errors", endpoint=endpoint, error=type(e).__name__)
+            raise
+        latency = time.monotonic() - start
+        # 供 proxy provider 記錄延遲及封鎖 (見 proxy.provider.HealthAwareProxiesProvider)
+        self.report_proxy(proxies, latency=latency, status_code=resp.status_code)
+
+        # elapsed 為送出至收到標頭 (含 DNS、連線及等待伺服器)，其後為下載內容
+        elapsed = resp.elapsed.total_seconds()
+        METRICS.observe("request", elapsed, endpoint=endpoint)
+        METRICS.observe("transfer", max(0.0, latency - elapsed), endpoint=endpoint)
+        METRICS.increment("response_bytes", len(resp.content), endpoint=endpoint)
+        METRICS.increment("responses", endpoint=endpoint, status=resp.status_code)
+        retry.raise_for_status(resp.url, resp.status_code, resp.headers)
+        return resp
+
     def get_string_date(self, year, month, day):
         return f"{year}{month:0>2}{day:0>2}"
 
@@ -113,8 +235,200 @@ class BaseFetcher:
                 )
         return value
 
+    def load_cache(self, date, route: Route):
+        if self._cache is None:
+            return None
+        return self._cache.get(route.url, route.params, date)
+
+    def store_cache(self, date, route: Route, resp, holiday=False):
+        """成功解析或過去日期之休市才寫入快取，避免保存不完整的資料"""
+        if self._cache is None:
+            return
+        if holiday and date >= datetime.datetime.now().strftime("%Y%m%d"):
+            return
+        self._cache.set(route.url, route.params, date, resp)
+
+    def parse_cached(self, date, route: Route, resp):
+        """解析 (不寫入快取)"""
+        with METRICS.timer("parse", endpoint=metrics.get_endpoint(route.url)):
+            return route.parse(date, resp)
+
+    def parse(self, date, route: Route, resp):
+        """解析新下載的資料並寫入快取"""
+        try:
+            data = self.parse_cached(date, route, resp)
+        except HolidayWarning:
+            self.store_cache(date, route, resp, holiday=True)
+            raise
+        self.store_cache(date, route, resp)
+        return data
+
+    def request(self, date, route: Route):
+        if route is None:
+            return None
+
+        endpoint = metrics.get_endpoint(route.url)
+        with METRICS.labels(date=date):
+            resp = self.load_cache(date, route)
+            if resp is not None:
+                METRICS.increment("cache_hits", endpoint=endpoint)
+                return self.parse_cached(date, route, resp)
+            # 僅重試此資料來源 (含資料為空的 ConnectionError)，不重抓其他已完成的資料
+            return self._retry_policy.call(
+                lambda: self.parse(date, route, self.get(route.url, route.params)), endpoint=endpoint
+            )
+
+    def adapter_fetch_price(self, date):
+        return self.request(date, self.route_price(date))
+
+    def adapter_fetch_institutional_investors(self, date):
+        return self.request(date, self.route_institutional_investors(date))
+
+    def adapter_fetch_credit_transactions_securities(self, date):
+        return self.request(date, self.route_credit_transactions_securities(date))
+
+    def routes(self, date):
+        """依序回傳 盤後行情、三大法人買賣超、融資融券餘額 的 Route，未啟用者為 None"""
+        return [
+            self.route_price(date),
+            self.route_institutional_investors(date),
+            self.route_credit_transactions_securities(date),
+        ]
+
+    def fetch_datasets(self, date):
+        """依序回傳 盤後行情、三大法人買賣超、融資融券餘額，concurrent 時三者同時抓取 (仍受主機 rate limit 限制)"""
+        adapters = [
+            self.adapter_fetch_price,
+            self.adapter_fetch_institutional_investors,
+            self.adapter_fetch_credit_transactions_securities,
+        ]
+        if not self._concurrent:
+            return [adapter(date) for adapter in adapters]
+
+        with ThreadPoolExecutor(max_workers=len(adapters)) as executor:
+            futures = [executor.submit(adapter, date) for adapter in adapters]
+            return [future.result() for future in futures]
+
+    def clean_rows(self, rows) -> list:
+        """
+        一次清理多列資料，結果與逐格呼叫 clean 相同
+            - 所有儲存格以 CLEAN_SEPARATOR 串接後只做一次 replace，再切回各列
+            - 含非字串或分隔字元之儲存格時，退回逐格 clean
+        """
+        with METRICS.timer("clean"):
+            cells = [value for row in rows for value in row]
+            try:
+                text = self.CLEAN_SEPARATOR.join(cells)
+            except TypeError:
+                return [[self.clean(value) for value in row] for row in rows]
+
+            values = (
+                text.replace(",", "")
+                .replace("⊕", "")
+                .replace("⊙", "")
+                .replace("+ ", "+")
+                .replace("- ", "-")
+                .split(self.CLEAN_SEPARATOR)
+            )
+            if len(values) != len(cells):
+                return [[self.clean(value) for value in row] for row in rows]
+
+            values = [None if "--" in cell else value.strip() for cell, value in zip(cells, values)]
+            results, start = [], 0
+            for row in rows:
+                end = start + len(row)
+                results += [values[start:end]]
+                start = end
+            return results
+
     def add(self, x, y):
-        return str(int(x) + int(y))
+        # typed 時直接回傳 int，省去 int -> str -> int 的轉換
+        value = int(x) + int(y)
+        return value if self._typed else str(value)
+
+    @property
+    def column_types(self):
+        """typed 時各欄位的型別，未列出者 (date、sid、name、note) 維持字串"""
+        if self._column_types is None:
+            types = {"category": int}
+            types.update({name: self.PRICE_TYPE for name in ["open", "high", "low", "close"]})
+            types.update({name: int for name in ["capacity", "transaction", "turnover"]})
+            types.update({name: int for name in self.institutional_investors_columns})
+            types.update({name: int for name in self.credit_transactions_securities_columns if name != "note"})
+            self._column_types = types
+        return self._column_types
+
+    def convert(self, value, cast, strict: bool = False):
+        """
+        轉為 cast 型別，EMPTY_VALUES 為 None，其他無法轉換的值 (如 "OX") 記錄 warning 並保留原值
+            - strict: 無法轉換的值改為 None，供欄位型別固定的輸出 (如 ParquetSink、BinarySink)
+        """
+        if value is None or isinstance(value, cast):
+            return value
+        if value in self.EMPTY_VALUES:
+            return None
+        try:
+            return cast(value)
+        except (ValueError, ArithmeticError):
+            action = "set to None" if strict else "keep the original value"
+            logger.warning("cannot convert %r to %s, %s", value, cast.__name__, action)
+            return None if strict else value
+
+    def get_schema(self, institutional_investors: bool, credit_transactions_securities: bool) -> list:
+        """依啟用的資料組合回傳欄位名稱，每個 fetcher 設定只計算一次"""
+        key = (institutional_investors, credit_transactions_securities)
+        if key not in self._schemas:
+            schema = self.base_columns + self.price_columns
+            if institutional_investors:
+                schema += self.institutional_investors_columns
+            if credit_transactions_securities:
+                schema += self.credit_transactions_securities_columns
+            self._schemas[key] = schema
+        return self._schemas[key]
+
+    def combine_columns(
+        self,
+        date: str,
+        category: StockCategory,
+        price: dict,
+        institutional_investors: dict or None,
+        credit_transactions_securities: dict or None,
+    ) -> ColumnarResult:
+        """combine 的欄位版本，每個欄位一個 list，直接附加至各欄位，不建立每筆資料的 list 或 dict"""
+        schema = self.get_schema(institutional_investors is not None, credit_transactions_securities is not None)
+        fillvalue = self.get_fillvalue(institutional_investors, credit_transactions_securities)
+
+        columns = {name: [] for name in schema}
+        segments = [(price, [columns[name] for name in self.price_columns])]
+        if institutional_investors is not None:
+            segments += [(institutional_investors, [columns[name] for name in self.institutional_investors_columns])]
+        if credit_transactions_securities is not None:
+            segments += [
+                (
+                    credit_transactions_securities,
+                    [columns[name] for name in self.credit_transactions_securities_columns],
+                )
+            ]
+
+        for id in price.keys():
+            columns["date"].append(date)
+            columns["category"].append(category)
+            for data, targets in segments:
+                values = data.get(id, [])
+                for index, target in enumerate(targets):
+                    target.append(values[index] if index < len(values) else fillvalue)
+
+        if self._typed:
+            for name, cast in self.column_types.items():
+                if name in columns:
+                    columns[name] = [self.convert(value, cast) for value in columns[name]]
+        return ColumnarResult(columns)
+
+    def get_fillvalue(self, institutional_investors, credit_transactions_securities):
+        # 僅盤後行情時缺值為 None，合併其他資料時缺值為 "0"
+        if institutional_investors is None and credit_transactions_securities is None:
+            return None
+        return "0"
 
     def combine(
         self,
@@ -124,45 +438,37 @@ class BaseFetcher:
         institutional_investors: dict or None,
         credit_transactions_securities: dict or None,
     ) -> list:
+        schema = self.get_schema(institutional_investors is not None, credit_transactions_securities is not None)
+        fillvalue = self.get_fillvalue(institutional_investors, credit_transactions_securities)
+        types = [(name, self.column_types[name]) for name in schema if name in self.column_types] if self._typed else []
+
+        # 各資料各自補齊至其欄位數，缺少其中一種資料時不會使後面的資料錯位 (與 combine_columns 相同)
+        segments = [(price, len(self.price_columns))]
+        if institutional_investors is not None:
+            segments += [(institutional_investors, len(self.institutional_investors_columns))]
+        if credit_transactions_securities is not None:
+            segments += [(credit_transactions_securities, len(self.credit_transactions_securities_columns))]
 
         results = []
         for id in price.keys():
-            if institutional_investors is not None and credit_transactions_securities is not None:
-                result = dict(
-                    itertools.zip_longest(
-                        self.base_columns
-                        + self.price_columns
-                        + self.institutional_investors_columns
-                        + self.credit_transactions_securities_columns,
-                        [date, category]
-                        + price[id]
-                        + institutional_investors.get(id, [])
-                        + credit_transactions_securities.get(id, []),
-                        fillvalue="0",
-                    )
-                )
-            elif institutional_investors is not None:
-                result = dict(
-                    itertools.zip_longest(
-                        self.base_columns + self.price_columns + self.institutional_investors_columns,
-                        [date, category] + price[id] + institutional_investors.get(id, []),
-                        fillvalue="0",
-                    )
-                )
-            elif credit_transactions_securities is not None:
-                result = dict(
-                    itertools.zip_longest(
-                        self.base_columns + self.price_columns + self.credit_transactions_securities_columns,
-                        [date, category] + price[id] + credit_transactions_securities.get(id, []),
-                        fillvalue="0",
-                    )
-                )
-            else:
-                result = dict(
-                    itertools.zip_longest(
-                        self.base_columns + self.price_columns, [date, category] + price[id], fillvalue=None
-                    )
-                )
-
+            values = [date, category]
+            for data, width in segments:
+                row = data.get(id, [])
+                values += row[:width] + [fillvalue] * (width - len(row))
+            result = dict(zip(schema, values))
+            for name, cast in types:
+                result[name] = self.convert(result[name], cast)
             results += [result]
         return results
+
+    def assemble(self, date: str, price, institutional_investors, credit_transactions_securities):
+        """依 columnar 設定回傳 ColumnarResult 或 list of dict"""
+        combine = self.combine_columns if self._columnar else self.combine
+        with METRICS.timer("combine", date=date, category=self.CATEGORY.name):
+            return combine(
+                date=date,
+                category=self.CATEGORY.value,
+                price=price,
+                institutional_investors=institutional_investors,
+                credit_transactions_securities=credit_transactions_securities,
+            )
@@ -0,0 +1,74 @@
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import time
+
+from .base import RawResponse
+
+CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "rawdata", "cache")
+
+
+class ResponseCache:
+    """
+    原始回應之磁碟快取，以 gzip 壓縮存放於 <directory>/<date>/<sha1(url, params)>.gz
+
+    - 已收盤 (早於今日) 的資料不再變動，永久有效，重跑時不需連網
+    - 今日 (含以後) 的資料僅於 ttl 秒內有效，過期即刪除
+    """
+
+    def __init__(self, directory: str = CACHE_PATH, ttl: int = 600):
+        self.directory = directory
+        self.ttl = ttl
+
+    def get_path(self, url: str, params: dict, date: str):
+        key = json.dumps([url, sorted(params.items())], ensure_ascii=False)
+        return os.path.join(self.directory, date, hashlib.sha1(key.encode("utf8")).hexdigest() + ".gz")
+
+    def is_expired(self, path: str, date: str):
+        if date < datetime.datetime.now().strftime("%Y%m%d"):
+            return False
+        return time.time() - os.path.getmtime(path) > self.ttl
+
+    def get(self, url: str, params: dict, date: str) -> RawResponse or None:
+        path = self.get_path(url, params, date)
+        if not os.path.isfile(path):
+            return None
+        if self.is_expired(path, date):
+            os.remove(path)
+            return None
+
+        with gzip.open(path, "rb") as f:
+            meta = json.loads(f.readline())
+            return RawResponse(content=f.read(), **meta)
+
+    def set(self, url: str, params: dict, date: str, resp):
+        path = self.get_path(url, params, date)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        resp = RawResponse.from_response(resp)
+        meta = {"url": resp.url, "status_code": resp.status_code, "encoding": resp.encoding}
+        tmp = f"{path}.tmp"
+        with gzip.open(tmp, "wb") as f:
+            f.write(json.dumps(meta, ensure_ascii=False).encode("utf8") + b"\n")
+            f.write(resp.content)
+        os.replace(tmp, path)
+
+    def evict(self):
+        """刪除所有已過期的今日快取"""
+        today = datetime.datetime.now().strftime("%Y%m%d")
+        if not os.path.isdir(self.directory):
+            return
+        for date in os.listdir(self.directory):
+            if date < today:
+                continue
+            directory = os.path.join(self.directory, date)
+            for name in os.listdir(directory):
+                path = os.path.join(directory, name)
+                if self.is_expired(path, date):
+                    os.remove(path)
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -0,0 +1,40 @@
+class ColumnarResult:
+    """
+    以欄位為單位存放的抓取結果，每個欄位一個 list
+
+    - result["close"] 取得整個欄位，result[0] 取得第 0 筆 dict
+    - 迭代時逐筆產生 dict，可直接交給 csv、json 及 sink 使用，不需先建立整份 list of dict
+    """
+
+    def __init__(self, columns: dict):
+        self.columns = columns
+
+    @classmethod
+    def concat(cls, results: list):
+        results = [result for result in results if result]
+        if not results:
+            return cls({})
+        return cls(
+            {name: [value for result in results for value in result.columns[name]] for name in results[0].columns}
+        )
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()), []))
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.columns[key]
+        return {name: values[key] for name, values in self.columns.items()}
+
+    def __iter__(self):
+        names = list(self.columns.keys())
+        for values in zip(*self.columns.values()):
+            yield dict(zip(names, values))
+
+    def __eq__(self, other):
+        if isinstance(other, ColumnarResult):
+            return self.columns == other.columns
+        return list(self) == other
+
+    def to_list(self) -> list:
+        return list(self)
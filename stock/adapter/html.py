@@ -0,0 +1,35 @@
+from bs4 import BeautifulSoup
+from lxml import etree
+import lxml.html
+
+
+def find_rows(text: str, tag: str, id: str = None, parser: str = "lxml"):
+    """
+    回傳第一個符合 tag (及 id) 之元素內，每個 tr 底下所有 td 的文字
+        - 找不到該元素時回傳 None
+        - parser="lxml" 直接走訪 lxml 樹，不建立 BeautifulSoup 物件；無法解析時改用 bs4
+        - parser="bs4" 即原本 BeautifulSoup(text, "lxml").find_all 的作法，兩者輸出相同
+    """
+    if parser == "lxml":
+        try:
+            return _find_rows_lxml(text, tag, id)
+        except (ValueError, etree.ParserError):
+            # 空白文件或含 encoding 宣告的 unicode 字串
+            pass
+    return _find_rows_bs4(text, tag, id)
+
+
+def _find_rows_lxml(text, tag, id):
+    root = lxml.html.fromstring(text)
+    nodes = root.xpath(f"//{tag}[@id=$id]", id=id) if id else root.xpath(f"//{tag}")
+    if not nodes:
+        return None
+    return [[td.text_content() for td in tr.iter("td")] for tr in nodes[0].iter("tr")]
+
+
+def _find_rows_bs4(text, tag, id):
+    soup = BeautifulSoup(text, "lxml")
+    node = soup.find(tag, id=id) if id else soup.find(tag)
+    if node is None:
+        return None
+    return [[td.text for td in tr.find_all("td")] for tr in node.find_all("tr")]
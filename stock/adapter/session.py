@@ -0,0 +1,34 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_TIMEOUT = (5, 30)
+
+
+def create_session(
+    pool_connections: int = 2,
+    pool_maxsize: int = 10,
+    max_retries: int = 0,
+    backoff_factor: float = 0.5,
+) -> requests.Session:
+    """
+    建立可共用的連線池 session，同一主機的請求沿用 keep-alive 連線
+        - pool_connections: 快取的主機連線池數量 (TWSE、TPEX)
+        - pool_maxsize: 每個主機連線池保留的連線數
+        - max_retries: 連線失敗時於 adapter 層重試次數，預設不重試
+        - backoff_factor: 重試間隔 backoff_factor * (2 ** (n - 1)) 秒
+        - 不依 HTTP 狀態重試，429/5xx 直接回傳，交由 box.retry.RetryPolicy 處理
+          (經過 rate limit、記錄 metrics 及 proxy 封鎖，並依 Retry-After 等待)
+    """
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
@@ -1,16 +1,20 @@
-from time import sleep
+import logging
 import urllib
 
-from bs4 import BeautifulSoup
-import requests
-
 from . import base
+from . import html
 from ..box.constants import StockCategory
 from ..box.exceptions import HolidayWarning
+from .base import Route
+
+logger = logging.getLogger(__name__)
 
 
 class TPEXFetcher(base.BaseFetcher):
     TPEX_BASE_URL = "http://www.tpex.org.tw/"
+    CATEGORY = StockCategory.TPEX
+    # 民國96年 HTML 報表之解析方式，"lxml" 直接走訪 lxml 樹，"bs4" 為 BeautifulSoup
+    HTML_PARSER = "lxml"
 
     def __init__(
         self,
@@ -19,6 +23,7 @@ class TPEXFetcher(base.BaseFetcher):
         enable_fetch_institutional_investors,
         enable_fetch_credit_transactions_securities,
         sleep_second,
+        **kwargs,
     ):
         super().__init__(
             proxy_provider=proxy_provider,
@@ -26,18 +31,12 @@ class TPEXFetcher(base.BaseFetcher):
             enable_fetch_institutional_investors=enable_fetch_institutional_investors,
             enable_fetch_credit_transactions_securities=enable_fetch_credit_transactions_securities,
             sleep_second=sleep_second,
+            **kwargs,
         )
 
     def fetch(self, year: int, month: int, day: int) -> list:
         date = self.check_date_format(f"{year}{month:0>2}{day:0>2}")
-        data = self.combine(
-            date=date,
-            category=StockCategory.TPEX.value,
-            price=self.adapter_fetch_price(date),
-            institutional_investors=self.adapter_fetch_institutional_investors(date),
-            credit_transactions_securities=self.adapter_fetch_credit_transactions_securities(date),
-        )
-        return data
+        return self.assemble(date, *self.fetch_datasets(date))
 
     def republic_era_datetime(self, date):
         year = int(date[0:4]) - 1911
@@ -45,59 +44,90 @@ class TPEXFetcher(base.BaseFetcher):
         day = int(date[6:8])
         return year, month, day
 
-    def adapter_fetch_price(self, date):
+    def republic_era_string(self, date):
+        year, month, day = self.republic_era_datetime(date)
+        return f"{year}/{month:0>2}/{day:0>2}"
+
+    def route_price(self, date):
         if self._enable_fetch_price:
-            sleep(self._sleep_second)
             if date < "20070101":
                 raise NotImplementedError
             elif date <= "20070630":
-                return self.__price_20070101_20070630(date)
+                return Route(
+                    url=urllib.parse.urljoin(
+                        self.TPEX_BASE_URL, "web/stock/aftertrading/otc_quotes_no1430B/stk_wn1430_print.php"
+                    ),
+                    params={
+                        "l": "zh-tw",
+                        "ajax": "true",
+                        "input_date": self.republic_era_string(date),
+                        "temp_sect": "AL",
+                    },
+                    parse=self.__price_20070101_20070630,
+                )
             else:
-                return self.__price_20070701_now(date)
+                return Route(
+                    url=urllib.parse.urljoin(
+                        self.TPEX_BASE_URL, "web/stock/aftertrading/otc_quotes_no1430/stk_wn1430_result.php"
+                    ),
+                    params={"l": "zh-tw", "o": "json", "se": "AL", "d": self.republic_era_string(date)},
+                    parse=self.__price_20070701_now,
+                )
         else:
             return None
 
-    def adapter_fetch_institutional_investors(self, date):
+    def route_institutional_investors(self, date):
         if self._enable_fetch_institutional_investors:
-            sleep(self._sleep_second)
             if date < "20070423":
                 raise NotImplementedError
             elif date <= "20141130":
-                return self.__institutional_investors_20070423_20141130(date)
+                return Route(
+                    url=urllib.parse.urljoin(self.TPEX_BASE_URL, "web/stock/3insti/daily_trade/3itrade_print.php"),
+                    params={"l": "zh-tw", "se": "AL", "t": "D", "d": self.republic_era_string(date), "s": "0,asc,0"},
+                    parse=self.__institutional_investors_20070423_20141130,
+                )
             else:
-                return self.__institutional_investors_20141201_now(date)
+                return Route(
+                    url=urllib.parse.urljoin(
+                        self.TPEX_BASE_URL, "web/stock/3insti/daily_trade/3itrade_hedge_result.php"
+                    ),
+                    params={
+                        "l": "zh-tw",
+                        "o": "json",
+                        "se": "AL",
+                        "t": "D",
+                        "d": self.republic_era_string(date),
+                        "s": "0,asc",
+                    },
+                    parse=self.__institutional_investors_20141201_now,
+                )
         else:
             return None
 
-    def adapter_fetch_credit_transactions_securities(self, date):
+    def route_credit_transactions_securities(self, date):
         if self._enable_fetch_credit_transactions_securities:
             if date < "20030801":
                 raise NotImplementedError
             elif date <= "20061231":
-                return self.__credit_transactions_securities_20030801_20061231(date)
+                # 20030801 ~ 20061231 尚未支援
+                raise NotImplementedError
             else:
-                return self.__credit_transactions_securities_20070101_now(date)
+                return Route(
+                    url=urllib.parse.urljoin(
+                        self.TPEX_BASE_URL, "web/stock/margin_trading/margin_balance/margin_bal_result.php?"
+                    ),
+                    params={"l": "zh-tw", "o": "html", "d": self.republic_era_string(date), "s": "0,asc"},
+                    parse=self.__credit_transactions_securities_20070101_now,
+                )
         else:
             return None
 
-    def __price_20070101_20070630(self, date):
+    def __price_20070101_20070630(self, date, resp):
         """
         證券櫃檯買賣中心 上櫃股票每日收盤行情(不含定價)
             - 本資訊自 民國96年1-6月 起開始提供
             - https://www.tpex.org.tw/web/stock/aftertrading/otc_quotes_no1430B/stk_wn1430.php?l=zh-tw
         """
-
-        year, month, day = self.republic_era_datetime(date)
-        resp = requests.get(
-            url=urllib.parse.urljoin(
-                self.TPEX_BASE_URL, "web/stock/aftertrading/otc_quotes_no1430B/stk_wn1430_print.php"
-            ),
-            params={"l": "zh-tw", "ajax": "true", "input_date": f"{year}/{month:0>2}/{day:0>2}", "temp_sect": "AL"},
-            proxies=self.get_proxy(),
-            headers=self.HEADERS,
-        )
-        soup = BeautifulSoup(resp.text, "lxml")
-
         columns = [
             "代號",
             "名稱",
@@ -117,13 +147,12 @@ class TPEXFetcher(base.BaseFetcher):
         ]
         columns = dict(zip(columns, range(len(columns))))
 
-        text = soup.find("div", id="contentArea")
+        text = html.find_rows(resp.text, "div", id="contentArea", parser=self.HTML_PARSER)
         if text is None:
             raise HolidayWarning(date)
 
         data = dict()
-        for row in text.find_all("tr")[1:]:
-            row = [self.clean(td.text) for td in row.find_all("td")]
+        for row in self.clean_rows(text[1:]):
             sid = row[columns["代號"]]
             if self.verify_stock_id_format(id=sid) is False:
                 continue
@@ -141,22 +170,12 @@ class TPEXFetcher(base.BaseFetcher):
             ]
         return data
 
-    def __price_20070701_now(self, date):
+    def __price_20070701_now(self, date, resp):
         """
         證券櫃檯買賣中心 上櫃股票每日收盤行情(不含定價)
             - 本資訊自民國96年7月起開始提供
             - https://www.tpex.org.tw/web/stock/aftertrading/otc_quotes_no1430/stk_wn1430.php?l=zh-tw
         """
-
-        year, month, day = self.republic_era_datetime(date)
-        resp = requests.get(
-            url=urllib.parse.urljoin(
-                self.TPEX_BASE_URL, "web/stock/aftertrading/otc_quotes_no1430/stk_wn1430_result.php"
-            ),
-            params={"l": "zh-tw", "o": "json", "se": "AL", "d": f"{year}/{month:0>2}/{day:0>2}"},
-            proxies=self.get_proxy(),
-            headers=self.HEADERS,
-        )
         rawdata = resp.json()
         if rawdata["iTotalRecords"] == 0:
             raise HolidayWarning(date)
@@ -181,8 +200,7 @@ class TPEXFetcher(base.BaseFetcher):
         columns = dict(zip(columns, range(len(columns))))
 
         data = dict()
-        for row in rawdata["aaData"]:
-            row = [self.clean(v) for v in row]
+        for row in self.clean_rows(rawdata["aaData"]):
             sid = row[columns["代號"]]
             if self.verify_stock_id_format(id=sid) is False:
                 continue
@@ -200,7 +218,7 @@ class TPEXFetcher(base.BaseFetcher):
             ]
         return data
 
-    def __institutional_investors_20070423_20141130(self, date):
+    def __institutional_investors_20070423_20141130(self, date, resp):
         """
         證券櫃檯買賣中心 三大法人買賣明細資訊
             - 本資訊自 民國96年4月21日 至 103年11月30日 開始提供
@@ -208,17 +226,6 @@ class TPEXFetcher(base.BaseFetcher):
             - 20070421 (星期六 國定假日)
             - 20070422 (星期日 國定假日)
         """
-
-        year, month, day = self.republic_era_datetime(date)
-
-        resp = requests.get(
-            url=urllib.parse.urljoin(self.TPEX_BASE_URL, "web/stock/3insti/daily_trade/3itrade_print.php"),
-            params={"l": "zh-tw", "se": "AL", "t": "D", "d": f"{year}/{month:0>2}/{day:0>2}", "s": "0,asc,0"},
-            proxies=self.get_proxy(),
-            headers=self.HEADERS,
-        )
-        soup = BeautifulSoup(resp.text, "lxml")
-
         columns = [
             "代號",
             "名稱",
@@ -235,13 +242,14 @@ class TPEXFetcher(base.BaseFetcher):
         ]
         columns = dict(zip(columns, range(len(columns))))
 
-        text = soup.find("tbody").find_all("tr")
-        if text == []:
+        text = html.find_rows(resp.text, "tbody", parser=self.HTML_PARSER)
+        if text is None:
+            raise ConnectionError(f"get data is empty, need to redownload. ({resp.url})")
+        elif text == []:
             raise HolidayWarning(date)
 
         data = dict()
-        for row in text:
-            row = [self.clean(td.text) for td in row.find_all("td")]
+        for row in self.clean_rows(text):
             sid = row[columns["代號"]]
             if self.verify_stock_id_format(id=sid) is False:
                 continue
@@ -260,28 +268,12 @@ class TPEXFetcher(base.BaseFetcher):
             ]
         return data
 
-    def __institutional_investors_20141201_now(self, date):
+    def __institutional_investors_20141201_now(self, date, resp):
         """
         證券櫃檯買賣中心 三大法人買賣明細資訊
             -- 本資訊自 民國103年12月01日 起開始提供
             -- https://www.tpex.org.tw/web/stock/3insti/daily_trade/3itrade_hedge.php
         """
-
-        year, month, day = self.republic_era_datetime(date)
-
-        resp = requests.get(
-            url=urllib.parse.urljoin(self.TPEX_BASE_URL, "web/stock/3insti/daily_trade/3itrade_hedge_result.php"),
-            params={
-                "l": "zh-tw",
-                "o": "json",
-                "se": "AL",
-                "t": "D",
-                "d": f"{year}/{month:0>2}/{day:0>2}",
-                "s": "0,asc",
-            },
-            proxies=self.get_proxy(),
-            headers=self.HEADERS,
-        )
         rawdata = resp.json()
         if rawdata["iTotalRecords"] == 0:
             raise HolidayWarning(date)
@@ -310,8 +302,7 @@ class TPEXFetcher(base.BaseFetcher):
             ]
             columns = dict(zip(columns, range(len(columns))))
             data = dict()
-            for row in rawdata["aaData"]:
-                row = [self.clean(v) for v in row]
+            for row in self.clean_rows(rawdata["aaData"]):
                 sid = row[columns["代號"]]
                 if self.verify_stock_id_format(id=sid) is False:
                     continue
@@ -360,8 +351,7 @@ class TPEXFetcher(base.BaseFetcher):
             ]
             columns = dict(zip(columns, range(len(columns))))
             data = dict()
-            for row in rawdata["aaData"]:
-                row = [self.clean(v) for v in row]
+            for row in self.clean_rows(rawdata["aaData"]):
                 sid = row[columns["代號"]]
                 if self.verify_stock_id_format(id=sid) is False:
                     continue
@@ -379,32 +369,16 @@ class TPEXFetcher(base.BaseFetcher):
                 ]
             return data
 
-    def __credit_transactions_securities_20030801_20061231(self, date):
-        raise NotImplementedError
-
-    def __credit_transactions_securities_20070101_now(self, date):
+    def __credit_transactions_securities_20070101_now(self, date, resp):
         """
         證券櫃檯買賣中心 上櫃股票融資融券餘額
             - 本資訊自民國96年1月起開始提供
             - https://www.tpex.org.tw/web/stock/margin_trading/margin_balance/margin_bal.php?l=zh-tw
         """
-
-        year, month, day = self.republic_era_datetime(date)
-
-        resp = requests.get(
-            url=urllib.parse.urljoin(
-                self.TPEX_BASE_URL, "web/stock/margin_trading/margin_balance/margin_bal_result.php?"
-            ),
-            params={"l": "zh-tw", "o": "html", "d": f"{year}/{month:0>2}/{day:0>2}", "s": "0,asc"},
-            proxies=self.get_proxy(),
-            headers=self.HEADERS,
-        )
         try:
             rawdata = resp.json()
-        except Exception as e:
-            print(f"--{type(e)}", e)
-            print(resp.url)
-            print(resp.text)
+        except Exception:
+            logger.exception("invalid json: %s\n%s", resp.url, resp.text)
             raise
         if rawdata["aaData"] == []:
             raise HolidayWarning(date)
@@ -434,8 +408,7 @@ class TPEXFetcher(base.BaseFetcher):
         columns = dict(zip(columns, range(len(columns))))
 
         data = dict()
-        for row in rawdata["aaData"]:
-            row = [self.clean(r) for r in row]
+        for row in self.clean_rows(rawdata["aaData"]):
             sid = row[columns["代號"]]
             if self.verify_stock_id_format(id=sid) is False:
                 continue
@@ -1,16 +1,18 @@
 from datetime import datetime
-from time import sleep
+import logging
 import urllib
 
-import requests
-
 from ..box.constants import StockCategory
 from ..box.exceptions import HolidayWarning
 from .base import BaseFetcher
+from .base import Route
+
+logger = logging.getLogger(__name__)
 
 
 class TWSEFetcher(BaseFetcher):
     TWSE_BASE_URL = "http://www.twse.com.tw/"
+    CATEGORY = StockCategory.TWSE
 
     def __init__(
         self,
@@ -19,6 +21,7 @@ class TWSEFetcher(BaseFetcher):
         enable_fetch_institutional_investors,
         enable_fetch_credit_transactions_securities,
         sleep_second,
+        **kwargs,
     ):
         super().__init__(
             proxy_provider=proxy_provider,
@@ -26,72 +29,63 @@ class TWSEFetcher(BaseFetcher):
             enable_fetch_institutional_investors=enable_fetch_institutional_investors,
             enable_fetch_credit_transactions_securities=enable_fetch_credit_transactions_securities,
             sleep_second=sleep_second,
+            **kwargs,
         )
 
     def fetch(self, year: int, month: int, day: int) -> list:
         date = self.check_date_format(f"{year}{month:0>2}{day:0>2}")
-        data = self.combine(
-            date=date,
-            category=StockCategory.TWSE.value,
-            price=self.adapter_fetch_price(date),
-            institutional_investors=self.adapter_fetch_institutional_investors(date),
-            credit_transactions_securities=self.adapter_fetch_credit_transactions_securities(date),
-        )
-        return data
+        return self.assemble(date, *self.fetch_datasets(date))
 
-    def adapter_fetch_price(self, date):
+    def route_price(self, date):
         if self._enable_fetch_price:
-            sleep(self._sleep_second)
             if date < "20040211":
                 raise NotImplementedError
             else:
-                return self.__price_20040211_now(date)
+                # 本資訊自民國93年2月11日起提供
+                return Route(
+                    url=urllib.parse.urljoin(self.TWSE_BASE_URL, "exchangeReport/MI_INDEX"),
+                    params={"response": "json", "date": date, "type": "ALL"},
+                    parse=self.__price_20040211_now,
+                )
         else:
             return None
 
-    def adapter_fetch_institutional_investors(self, date):
+    def route_institutional_investors(self, date):
         if self._enable_fetch_institutional_investors:
-            sleep(self._sleep_second)
             if date < "20120502":
                 raise NotImplementedError
             else:
-                return self.__institutional_investors_20120502_now(date)
+                return Route(
+                    url=urllib.parse.urljoin(self.TWSE_BASE_URL, "fund/T86"),
+                    params={"response": "json", "date": date, "selectType": "ALL"},
+                    parse=self.__institutional_investors_20120502_now,
+                )
         else:
             return None
 
-    def adapter_fetch_credit_transactions_securities(self, date):
+    def route_credit_transactions_securities(self, date):
         if self._enable_fetch_credit_transactions_securities:
-            sleep(self._sleep_second)
             if date < "20010101":
                 raise NotImplementedError
             else:
-                return self.__credit_transactions_securities_20010101_now(date)
+                return Route(
+                    url=urllib.parse.urljoin(self.TWSE_BASE_URL, "exchangeReport/MI_MARGN"),
+                    params={"response": "json", "date": date, "selectType": "ALL"},
+                    parse=self.__credit_transactions_securities_20010101_now,
+                )
         else:
             return None
 
-    def __price_20040211_now(self, date):
+    def __price_20040211_now(self, date, resp):
         """
         台灣證券交易所 每日收盤行情
             -- 本資訊自 民國93年2月11日 起提供
             -- https://www.twse.com.tw/exchangeReport/MI_INDEX
         """
-        self.get_proxy()
-
-        # 本資訊自民國93年2月11日起提供
-        resp = requests.get(
-            url=urllib.parse.urljoin(self.TWSE_BASE_URL, "exchangeReport/MI_INDEX"),
-            params={"response": "json", "date": date, "type": "ALL"},
-            proxies=self.get_proxy(),
-            headers=self.HEADERS,
-        )
         try:
             rawdata = resp.json()
-        except Exception as e:
-            print("-" * 100)
-            print(e)
-            print("resp.url", resp.url)
-            print("resp.text", resp.text)
-            print()
+        except Exception:
+            logger.exception("invalid json: %s\n%s", resp.url, resp.text)
             raise
 
         if rawdata["stat"] == "很抱歉，沒有符合條件的資料!":
@@ -121,8 +115,7 @@ class TWSEFetcher(BaseFetcher):
         columns = dict(zip(columns, range(len(columns))))
 
         data = dict()
-        for row in rawdata[f"data{index}"]:
-            row = [self.clean(r) for r in row]
+        for row in self.clean_rows(rawdata[f"data{index}"]):
             sid = row[columns["證券代號"]]
             if self.verify_stock_id_format(id=sid) is False:
                 continue
@@ -140,18 +133,12 @@ class TWSEFetcher(BaseFetcher):
             ]
         return data
 
-    def __institutional_investors_20120502_now(self, date):
+    def __institutional_investors_20120502_now(self, date, resp):
         """
         台灣證券交易所 三大法人買賣超日報
             -- 本資訊自 民國101年5月2日 起提供
             -- https://www.twse.com.tw/zh/page/trading/fund/T86.html
         """
-        resp = requests.get(
-            url=urllib.parse.urljoin(self.TWSE_BASE_URL, "fund/T86"),
-            params={"response": "json", "date": date, "selectType": "ALL"},
-            proxies=self.get_proxy(),
-            headers=self.HEADERS,
-        )
         rawdata = resp.json()
 
         if rawdata["stat"] == "很抱歉，沒有符合條件的資料!":
@@ -163,8 +150,7 @@ class TWSEFetcher(BaseFetcher):
         columns = dict(zip(columns, range(len(columns))))
 
         data = dict()
-        for row in rawdata["data"]:
-            row = [self.clean(r) for r in row]
+        for row in self.clean_rows(rawdata["data"]):
             sid = row[columns["證券代號"]].replace(",", "")
 
             if self.verify_stock_id_format(id=sid) is False:
@@ -270,24 +256,16 @@ class TWSEFetcher(BaseFetcher):
 
         return data
 
-    def __credit_transactions_securities_20010101_now(self, date):
+    def __credit_transactions_securities_20010101_now(self, date, resp):
         """
         台灣證券交易所 每日收盤行情
             - 本資訊自民國90年01月01日起提供
             - https://www.twse.com.tw/zh/page/trading/exchange/MI_MARGN.html
         """
-        resp = requests.get(
-            url=urllib.parse.urljoin(self.TWSE_BASE_URL, "exchangeReport/MI_MARGN"),
-            params={"response": "json", "date": date, "selectType": "ALL"},
-            proxies=self.get_proxy(),
-            headers=self.HEADERS,
-        )
         try:
             rawdata = resp.json()
-        except Exception as e:
-            print(f"--{type(e)}", e)
-            print(resp.url)
-            print(resp.text)
+        except Exception:
+            logger.exception("invalid json: %s\n%s", resp.url, resp.text)
             raise
         if len(rawdata["data"]) == 0:
             raise HolidayWarning(date)
@@ -313,8 +291,7 @@ class TWSEFetcher(BaseFetcher):
         columns = dict(zip(columns, range(len(columns))))
 
         data = dict()
-        for row in rawdata["data"]:
-            row = [self.clean(r) for r in row]
+        for row in self.clean_rows(rawdata["data"]):
             sid = row[columns["股票代號"]]
             if self.verify_stock_id_format(id=sid) is False:
                 continue
@@ -337,18 +314,15 @@ class TWSEFetcher(BaseFetcher):
 
     def get_holidays(self):
         holidays = []
-        for year in range(2020, 2002 - 1, -1):
-            sleep(1)
+        for year in range(datetime.now().year, 2002 - 1, -1):
             holidays += self._get_holiday(year)
         return holidays
 
     def _get_holiday(self, year):
-        republic_era_year = self.republic_era_datetime(str(year))
-        resp = requests.get(
+        republic_era_year = year - 1911
+        resp = self.get(
             url=urllib.parse.urljoin(self.TWSE_BASE_URL, "holidaySchedule/holidaySchedule"),
             params={"response": "csv", "queryYear": republic_era_year},
-            proxies=self.get_proxy(),
-            headers=self.HEADERS,
         )
 
         text = resp.text.strip().split("\n")
@@ -0,0 +1,272 @@
+import asyncio
+import collections
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+import datetime
+import functools
+import logging
+import time
+from typing import Dict, List
+
+import aiohttp
+
+from .adapter import tpex
+from .adapter import twse
+from .adapter.base import RawResponse
+from .adapter.base import Route
+from .adapter.cache import ResponseCache
+from .adapter.session import DEFAULT_TIMEOUT
+from .box import calendar
+from .box import metrics
+from .box import retry
+from .box.exceptions import HolidayWarning
+from .box.metrics import METRICS
+from .box.retry import RETRY_EXCEPTIONS
+from .box.retry import RetryPolicy
+from .client import get_checkpoint
+from .client import get_datasets
+from .proxy import provider
+from .sink import file
+from .sink.base import BaseSink
+
+logger = logging.getLogger(__name__)
+
+
+async def run_in_executor(func, *args):
+    """讀取快取、解析及 combine 於 thread pool 執行，不阻塞其他下載；沿用目前的 metrics labels"""
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(None, functools.partial(context.run, func, *args))
+
+
+def get_trace_config() -> aiohttp.TraceConfig:
+    """記錄 DNS 查詢及建立連線的時間 (requests 無法分開取得，見 BaseFetcher.get)"""
+
+    async def on_request_start(session, context, params):
+        context.endpoint = metrics.get_endpoint(str(params.url))
+
+    async def on_start(session, context, params):
+        context.start = time.perf_counter()
+
+    def on_end(name):
+        async def _on_end(session, context, params):
+            METRICS.observe(name, time.perf_counter() - context.start, endpoint=context.endpoint)
+
+        return _on_end
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_dns_resolvehost_start.append(on_start)
+    trace_config.on_dns_resolvehost_end.append(on_end("dns"))
+    trace_config.on_connection_create_start.append(on_start)
+    trace_config.on_connection_create_end.append(on_end("connect"))
+    return trace_config
+
+
+class AsyncTaiwanStockClient:
+    """
+    TaiwanStockClient 的 asyncio 版本
+
+    - 以 aiohttp 非同步下載，沿用 TWSEFetcher、TPEXFetcher 的 route、解析及 combine
+    - 與 TaiwanStockClient 共用每個主機的 token bucket
+    - 每個資料來源各自重試 (見 box.retry.RetryPolicy)，未指定 retry_policy 時依 max_retries、backoff_factor 建立
+
+        async with AsyncTaiwanStockClient() as client:
+            rawdata = await client.fetch(2020, 1, 2)
+    """
+
+    def __init__(
+        self,
+        proxy_provider: object = provider.NoProxyProvier(),
+        enable_fetch_institutional_investors: bool = False,
+        enable_fetch_credit_transactions_securities: bool = False,
+        timeout: tuple = DEFAULT_TIMEOUT,
+        rate_limit: tuple = None,
+        pool_size: int = 100,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        cache: ResponseCache = None,
+        typed: bool = False,
+        retry_policy: RetryPolicy = None,
+    ):
+        kwargs = {
+            "proxy_provider": proxy_provider,
+            "enable_fetch_price": True,
+            "enable_fetch_institutional_investors": enable_fetch_institutional_investors,
+            "enable_fetch_credit_transactions_securities": enable_fetch_credit_transactions_securities,
+            "sleep_second": 0,
+            "timeout": timeout,
+            "rate_limit": rate_limit,
+            "cache": cache,
+            "typed": typed,
+        }
+        self.tpex = tpex.TPEXFetcher(**kwargs)
+        self.twse = twse.TWSEFetcher(**kwargs)
+
+        self._timeout = timeout
+        self._pool_size = pool_size
+        if retry_policy is None:
+            retry_policy = RetryPolicy(
+                max_retries=max_retries,
+                backoff_factor=backoff_factor,
+                exceptions=RETRY_EXCEPTIONS + (aiohttp.ClientError, asyncio.TimeoutError),
+            )
+        self._retry_policy = retry_policy
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        # ClientSession 須於 event loop 內建立
+        if self._session is None:
+            connect, read = self._timeout
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self._pool_size),
+                timeout=aiohttp.ClientTimeout(sock_connect=connect, sock_read=read),
+                trace_configs=[get_trace_config()],
+            )
+        return self._session
+
+    async def get(self, fetcher, url, params) -> RawResponse:
+        endpoint = metrics.get_endpoint(url)
+        proxies = fetcher.get_proxy() or {}
+        METRICS.observe("ratelimit_wait", await fetcher.get_bucket(url, proxies).acquire_async(), endpoint=endpoint)
+        start = time.monotonic()
+        try:
+            async with self.session.get(url, params=params, headers=fetcher.HEADERS, proxy=proxies.get("http")) as resp:
+                elapsed = time.monotonic() - start
+                content = await resp.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            fetcher.report_proxy(proxies, error=e)
+            METRICS.increment("request_errors", endpoint=endpoint, error=type(e).__name__)
+            raise
+        latency = time.monotonic() - start
+        fetcher.report_proxy(proxies, latency=latency, status_code=resp.status)
+
+        METRICS.observe("request", elapsed, endpoint=endpoint)
+        METRICS.observe("transfer", latency - elapsed, endpoint=endpoint)
+        METRICS.increment("response_bytes", len(content), endpoint=endpoint)
+        METRICS.increment("responses", endpoint=endpoint, status=resp.status)
+
+        retry.raise_for_status(str(resp.url), resp.status, resp.headers)
+        return RawResponse(url=str(resp.url), status_code=resp.status, content=content, encoding=resp.charset)
+
+    async def request(self, fetcher, date: str, route: Route):
+        if route is None:
+            return None
+
+        endpoint = metrics.get_endpoint(route.url)
+        # 每個 request 為 asyncio.gather 建立的獨立 task，labels 不會互相影響
+        with METRICS.labels(date=date):
+            resp = await run_in_executor(fetcher.load_cache, date, route)
+            if resp is not None:
+                METRICS.increment("cache_hits", endpoint=endpoint)
+                return await run_in_executor(fetcher.parse_cached, date, route, resp)
+
+            async def download():
+                resp = await self.get(fetcher, route.url, route.params)
+                return await run_in_executor(fetcher.parse, date, route, resp)
+
+            return await self._retry_policy.call_async(download, endpoint=endpoint)
+
+    async def _fetch(self, fetcher, year: int, month: int, day: int) -> list:
+        date = fetcher.check_date_format(f"{year}{month:0>2}{day:0>2}")
+        routes = fetcher.routes(date)
+        price, institutional_investors, credit_transactions_securities = await asyncio.gather(
+            *[self.request(fetcher, date, route) for route in routes]
+        )
+        return await run_in_executor(
+            fetcher.assemble, date, price, institutional_investors, credit_transactions_securities
+        )
+
+    async def fetch(self, year: int, month: int, day: int) -> List[Dict]:
+        try:
+            twse_data, tpex_data = await asyncio.gather(
+                self._fetch(self.twse, year, month, day), self._fetch(self.tpex, year, month, day)
+            )
+        except HolidayWarning as e:
+            logger.info(e)
+            return None
+        return twse_data + tpex_data
+
+    async def fetch_range(
+        self,
+        start: datetime.date,
+        end: datetime.date,
+        sink: BaseSink = None,
+        checkpoint: str = None,
+        holidays: set = None,
+        concurrency: int = 8,
+    ) -> List[str]:
+        """
+        TaiwanStockClient.fetch_range 的 asyncio 版本
+
+        - 最多同時抓取 concurrency 個交易日，實際請求頻率仍受各主機 rate limit 限制
+        - 依日期順序寫入 sink (如 BinarySink 僅能依序附加)，最多 concurrency * 2 個交易日等待寫入
+        - sink 及 checkpoint 於單一背景執行緒寫入，不阻塞 event loop
+        - 回傳本次完成的日期
+        """
+        sink = file.CSVSink() if sink is None else sink
+        checkpoint = get_checkpoint(sink, checkpoint, get_datasets(self.twse))
+        today = datetime.date.today()
+        semaphore = asyncio.Semaphore(concurrency)
+        loop = asyncio.get_running_loop()
+
+        completed = []
+
+        def commit(committed):
+            for string_date in committed:
+                checkpoint.mark(string_date)
+            completed.extend(committed)
+
+        def write(string_date, rawdata):
+            with METRICS.timer("sink_write", sink=type(sink).__name__, date=string_date):
+                commit(sink.write(string_date, rawdata))
+
+        def close():
+            with METRICS.timer("sink_close", sink=type(sink).__name__):
+                commit(sink.close())
+
+        async def fetch(date):
+            async with semaphore:
+                return await self.fetch(date.year, date.month, date.day)
+
+        async def save(date, task):
+            string_date = date.strftime("%Y%m%d")
+            rawdata = await task
+            if rawdata:
+                await loop.run_in_executor(writer, write, string_date, rawdata)
+            elif date < today:
+                await loop.run_in_executor(writer, commit, [string_date])
+            # 當日資料可能尚未公布，不列入已完成
+
+        # 資料庫連線及 transaction 屬於執行緒，close 亦須於寫入的執行緒執行
+        writer = ThreadPoolExecutor(max_workers=1)
+        window = collections.deque()
+        try:
+            for date in calendar.trading_days(start, end, holidays=holidays):
+                if date.strftime("%Y%m%d") in checkpoint:
+                    continue
+                window.append((date, asyncio.ensure_future(fetch(date))))
+                if len(window) >= concurrency * 2:
+                    await save(*window.popleft())
+            while window:
+                await save(*window.popleft())
+        finally:
+            # 中止時取消其餘仍在抓取的交易日
+            for date, task in window:
+                task.cancel()
+            await asyncio.gather(*[task for date, task in window], return_exceptions=True)
+            await loop.run_in_executor(writer, close)
+            # close 已完成，不需於 event loop 內等待執行緒結束
+            writer.shutdown(wait=False)
+        return sorted(completed)
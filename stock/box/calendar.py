@@ -0,0 +1,29 @@
+import datetime
+import json
+import os
+
+HOLIDAYS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "holidays.json")
+
+
+def load_holidays(path: str = HOLIDAYS_PATH) -> set:
+    """
+    讀取 TaiwanStockClient.get_holidays_to_csv 產生之休市日期
+        - 名稱含「交易日」者(如: 春節前最後交易日)為開市日，不列入休市
+        - 檔案不存在時回傳空集合，僅略過週末
+    """
+    if not os.path.isfile(path):
+        return set()
+
+    with open(path, "r", encoding="utf8") as f:
+        rows = json.load(f)["total"]
+    return {row["date"] for row in rows if "交易日" not in row["name"]}
+
+
+def trading_days(start: datetime.date, end: datetime.date, holidays: set = None):
+    """依序產生 start ~ end (含) 之間的交易日，略過週末及休市日"""
+    holidays = load_holidays() if holidays is None else holidays
+    date = start
+    while date <= end:
+        if date.weekday() < 5 and date.strftime("%Y%m%d") not in holidays:
+            yield date
+        date += datetime.timedelta(days=1)
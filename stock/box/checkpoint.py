@@ -0,0 +1,33 @@
+import datetime
+import json
+import os
+
+
+class Checkpoint:
+    """記錄已完成的抓取日期，中斷後可從上次進度繼續"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.completed = set()
+        if os.path.isfile(path):
+            with open(path, "r", encoding="utf8") as f:
+                self.completed = set(json.load(f)["completed"])
+
+    def __contains__(self, date: str):
+        return date in self.completed
+
+    def mark(self, date: str):
+        self.completed.add(date)
+        self.save()
+
+    def save(self):
+        # 先寫入暫存檔再置換，避免中斷時留下不完整的檔案
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf8") as f:
+            json.dump(
+                obj={"updated_at": str(datetime.datetime.now()), "completed": sorted(self.completed)},
+                fp=f,
+                ensure_ascii=False,
+                indent=2,
+            )
+        os.replace(tmp, self.path)
@@ -1,11 +1,18 @@
 from functools import wraps
+import logging
 from time import sleep
 
 import requests
 
 from .exceptions import HolidayWarning
+from .metrics import METRICS
+from .retry import RetryPolicy
+
+logger = logging.getLogger(__name__)
 
 DEFAULT_RUN_TIMES = 3
+# 各請求已於 BaseFetcher.request 個別重試，此處僅為整日重抓的最後手段
+MONITOR_RETRY_POLICY = RetryPolicy(backoff_factor=5, max_backoff=30)
 
 
 def monitor(factor_or_func: int or object = None):
@@ -13,7 +20,7 @@ def monitor(factor_or_func: int or object = None):
         @wraps(func)
         def wrapper(*args, **kwargs):
             params = ", ".join([str(a) for a in args[1:]] + [f"{k}={v}" for k, v in kwargs])
-            print(func.__qualname__ + f"({params})")
+            logger.info("%s(%s)", func.__qualname__, params)
 
             if "factor_or_func" not in locals() or callable(factor_or_func) or factor_or_func is None:
                 factor = DEFAULT_RUN_TIMES
@@ -24,11 +31,15 @@ def monitor(factor_or_func: int or object = None):
                     return func(*args, **kwargs)
                 except HolidayWarning as e:
                     sleep(2)
-                    print(e)
+                    logger.info(e)
                     return
                 except (requests.exceptions.ConnectionError, ConnectionError) as e:
-                    print(f'  --{type(e).__name__}: "{e}"')
-                    sleep(30)
+                    logger.warning('%s: "%s"', type(e).__name__, e)
+                    if i == factor - 1:
+                        # 重試次數用盡，交由呼叫端處理 (如 fetch_range 保留 checkpoint 後中止)
+                        raise
+                    METRICS.increment("retries", endpoint=func.__qualname__, error=type(e).__name__)
+                    sleep(MONITOR_RETRY_POLICY.get_delay(i, getattr(e, "retry_after", None)))
                 except (Exception, NotImplementedError):
                     raise
 
@@ -3,7 +3,8 @@ from datetime import datetime
 
 class HolidayWarning(Exception):
     def __init__(self, date):
-        super().__init__()
+        # 傳入 date 使例外可 pickle (如由 process pool 回傳)
+        super().__init__(date)
         self.date = date
 
     def __str__(self):
@@ -15,3 +16,18 @@ class HolidayWarning(Exception):
 
 class DateFormatError(Exception):
     pass
+
+
+class ThrottledError(ConnectionError):
+    """伺服器要求降低頻率 (429、503)，retry_after 為要求等待的秒數"""
+
+    STATUS = (429, 503)
+
+    def __init__(self, url, status_code, retry_after=None):
+        super().__init__(url, status_code, retry_after)
+        self.url = url
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    def __str__(self):
+        return f"status {self.status_code}, retry after {self.retry_after}s. ({self.url})"
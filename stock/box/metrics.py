@@ -0,0 +1,134 @@
+import contextlib
+import contextvars
+import json
+import threading
+import time
+import urllib.parse
+
+# 目前的共用 labels (如 date)，由 Metrics.labels 設定，於同一執行緒 / task 內的紀錄自動套用
+_LABELS = contextvars.ContextVar("metrics_labels", default={})
+
+
+def get_endpoint(url: str) -> str:
+    parsed = urllib.parse.urlparse(url)
+    return f"{parsed.netloc}{parsed.path}"
+
+
+class Metrics:
+    """
+    行程內的計時及計數，依 (名稱, labels) 彙總
+
+    - observe / timer: 計時 (秒)，記錄次數、總和及最大值
+    - increment: 計數，如位元組數、HTTP 狀態、重試次數
+    - add_hook(hook): 每筆紀錄即時呼叫 hook(kind, name, value, labels)，可轉送至其他監控系統
+    - to_prometheus / to_json 匯出目前的彙總
+    """
+
+    def __init__(self, prefix: str = "stock"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._timings = dict()
+        self._counters = dict()
+        self._hooks = []
+
+    @contextlib.contextmanager
+    def labels(self, **labels):
+        token = _LABELS.set({**_LABELS.get(), **labels})
+        try:
+            yield
+        finally:
+            _LABELS.reset(token)
+
+    def get_labels(self, labels: dict) -> tuple:
+        return tuple(sorted((key, str(value)) for key, value in {**_LABELS.get(), **labels}.items()))
+
+    def emit(self, kind: str, name: str, value, labels: tuple):
+        for hook in self._hooks:
+            hook(kind, name, value, dict(labels))
+
+    def observe(self, name: str, seconds: float, **labels):
+        labels = self.get_labels(labels)
+        with self._lock:
+            timing = self._timings.setdefault((name, labels), [0, 0.0, 0.0])
+            timing[0] += 1
+            timing[1] += seconds
+            timing[2] = max(timing[2], seconds)
+        self.emit("timing", name, seconds, labels)
+
+    def increment(self, name: str, value: int = 1, **labels):
+        labels = self.get_labels(labels)
+        with self._lock:
+            self._counters[(name, labels)] = self._counters.get((name, labels), 0) + value
+        self.emit("counter", name, value, labels)
+
+    @contextlib.contextmanager
+    def timer(self, name: str, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def add_hook(self, hook):
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self._hooks.remove(hook)
+
+    def reset(self):
+        with self._lock:
+            self._timings.clear()
+            self._counters.clear()
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "timings": [
+                    {"name": name, "labels": dict(labels), "count": count, "sum": total, "max": maximum}
+                    for (name, labels), (count, total, maximum) in sorted(self._timings.items())
+                ],
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self._counters.items())
+                ],
+            }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
+    def format_labels(self, labels: dict) -> str:
+        if not labels:
+            return ""
+        escaped = {
+            key: value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for key, value in labels.items()
+        }
+        return "{" + ",".join(f'{key}="{value}"' for key, value in escaped.items()) + "}"
+
+    def to_prometheus(self) -> str:
+        """Prometheus text format，計時為 summary (_count、_sum) 及 gauge (_max)，計數為 counter (_total)"""
+        data = self.to_dict()
+        lines, declared = [], set()
+        for timing in data["timings"]:
+            name = f"{self.prefix}_{timing['name']}_seconds"
+            labels = self.format_labels(timing["labels"])
+            if name not in declared:
+                declared.add(name)
+                lines += [f"# TYPE {name} summary"]
+            lines += [f"{name}_count{labels} {timing['count']}", f"{name}_sum{labels} {timing['sum']:.6f}"]
+        for timing in data["timings"]:
+            name = f"{self.prefix}_{timing['name']}_seconds_max"
+            if name not in declared:
+                declared.add(name)
+                lines += [f"# TYPE {name} gauge"]
+            lines += [f"{name}{self.format_labels(timing['labels'])} {timing['max']:.6f}"]
+        for counter in data["counters"]:
+            name = f"{self.prefix}_{counter['name']}_total"
+            if name not in declared:
+                declared.add(name)
+                lines += [f"# TYPE {name} counter"]
+            lines += [f"{name}{self.format_labels(counter['labels'])} {counter['value']}"]
+        return "\n".join(lines) + "\n"
+
+
+# 行程內共用
+METRICS = Metrics()
@@ -0,0 +1,61 @@
+import asyncio
+import collections
+import threading
+import time
+
+_BUCKETS = dict()
+_BUCKETS_LOCK = threading.Lock()
+
+
+class TokenBucket:
+    """
+    桶內共 capacity 個 token，每個 token 取用後經過 period 秒歸還
+        - 未達上限時可連續送出 (burst)，僅在 token 用盡時等待
+        - 任意 period 秒內最多送出 capacity 次，符合「5秒內不能存取超過3次」之限制
+    """
+
+    def __init__(self, capacity: int, period: float):
+        self.capacity = capacity
+        self.period = period
+        self._lock = threading.Lock()
+        self._issued = collections.deque()
+
+    def _reserve(self):
+        """取得 token 回傳 0，否則回傳需等待的秒數"""
+        with self._lock:
+            now = time.monotonic()
+            while self._issued and now - self._issued[0] >= self.period:
+                self._issued.popleft()
+            if len(self._issued) < self.capacity:
+                self._issued.append(now)
+                return 0
+            return self.period - (now - self._issued[0])
+
+    def acquire(self) -> float:
+        """取得一個 token，回傳等待的秒數"""
+        waited = 0
+        while True:
+            wait = self._reserve()
+            if wait == 0:
+                return waited
+            time.sleep(wait)
+            waited += wait
+
+    async def acquire_async(self) -> float:
+        """acquire 的 asyncio 版本，等待時不阻塞 event loop"""
+        waited = 0
+        while True:
+            wait = self._reserve()
+            if wait == 0:
+                return waited
+            await asyncio.sleep(wait)
+            waited += wait
+
+
+def get_bucket(key, capacity: int, period: float) -> TokenBucket:
+    """同一 key (如主機名稱) 與相同 (capacity, period) 設定於行程內共用同一個 TokenBucket"""
+    key = (key, capacity, period)
+    with _BUCKETS_LOCK:
+        if key not in _BUCKETS:
+            _BUCKETS[key] = TokenBucket(capacity=capacity, period=period)
+        return _BUCKETS[key]
@@ -0,0 +1,106 @@
+import asyncio
+import datetime
+import email.utils
+import logging
+import random
+import time
+
+import requests
+
+from .exceptions import ThrottledError
+from .metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# 暫時性錯誤：連線失敗、逾時、資料為空 (ConnectionError) 及被限速 (ThrottledError)
+RETRY_EXCEPTIONS = (requests.exceptions.RequestException, ConnectionError)
+# 由 RetryPolicy 重試的 HTTP 狀態 (session 不重試，見 adapter.session.create_session)
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+def parse_retry_after(value) -> float or None:
+    """Retry-After 標頭可為秒數或 HTTP 日期"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (when - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+
+class RetryPolicy:
+    """
+    重試策略，用於單一請求 (BaseFetcher.request) 而非整日重抓
+
+    - 第 n 次重試前等待 min(max_backoff, backoff_factor * 2 ** n) 秒
+    - jitter 時改為 0 ~ 該秒數之間的亂數 (full jitter)，避免多個請求同時重試
+    - 伺服器要求等待 (ThrottledError.retry_after) 時至少等待該秒數
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        backoff_factor: float = 1.0,
+        max_backoff: float = 60.0,
+        jitter: bool = True,
+        exceptions: tuple = RETRY_EXCEPTIONS,
+    ):
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.exceptions = exceptions
+
+    def get_delay(self, attempt: int, retry_after: float = None) -> float:
+        delay = min(self.max_backoff, self.backoff_factor * 2**attempt)
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def _before_retry(self, attempt: int, error: Exception, endpoint: str) -> float:
+        """記錄重試並回傳等待秒數，call 及 call_async 共用"""
+        delay = self.get_delay(attempt, getattr(error, "retry_after", None))
+        logger.warning('%s: "%s", retry in %.1fs', type(error).__name__, error, delay)
+        METRICS.increment("retries", endpoint=endpoint, error=type(error).__name__)
+        METRICS.observe("retry_wait", delay, endpoint=endpoint)
+        return delay
+
+    def call(self, func, *args, endpoint: str = None, **kwargs):
+        """endpoint: 重試次數及等待時間的 metrics label"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return func(*args, **kwargs)
+            except self.exceptions as e:
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self._before_retry(attempt, e, endpoint))
+
+    async def call_async(self, func, *args, endpoint: str = None, **kwargs):
+        """call 的 asyncio 版本，func 為 coroutine function，等待時不阻塞 event loop"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await func(*args, **kwargs)
+            except self.exceptions as e:
+                if attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(self._before_retry(attempt, e, endpoint))
+
+
+def raise_for_throttle(url, status_code: int, headers):
+    """429、503 視為限速，依 Retry-After 等待後重試"""
+    if status_code in ThrottledError.STATUS:
+        raise ThrottledError(url, status_code, parse_retry_after(headers.get("Retry-After")))
+
+
+def raise_for_status(url, status_code: int, headers):
+    """限速時 raise ThrottledError，其餘 RETRY_STATUS raise ConnectionError，交由 RetryPolicy 重試"""
+    raise_for_throttle(url, status_code, headers)
+    if status_code in RETRY_STATUS:
+        raise ConnectionError(f"status {status_code}, need to redownload. ({url})")
@@ -1,19 +1,55 @@
-import csv
+from concurrent.futures import ThreadPoolExecutor
 import datetime
+import hashlib
 import json
 import os
-from typing import Dict, List
+from typing import Dict, Iterator, List
 
 import pymysql
+import requests
 
 from .adapter import tpex
 from .adapter import twse
+from .adapter.cache import ResponseCache
+from .adapter.columnar import ColumnarResult
+from .adapter.session import create_session
+from .adapter.session import DEFAULT_TIMEOUT
+from .box import calendar
+from .box.checkpoint import Checkpoint
 from .box.decorators import monitor
-from .orm import models
+from .box.metrics import METRICS
+from .box.retry import RetryPolicy
 from .orm import SQLFactory
+from .pipeline import ParsePipeline
 from .proxy import provider
+from .scheduler import ProxyScheduler
+from .sink import file
+from .sink import sql
+from .sink.base import BaseSink
 
-PATH = os.path.dirname(os.path.abspath(__file__))
+
+def get_datasets(fetcher) -> tuple:
+    """啟用的資料種類"""
+    datasets = ("price",)
+    if fetcher._enable_fetch_institutional_investors:
+        datasets += ("institutional_investors",)
+    if fetcher._enable_fetch_credit_transactions_securities:
+        datasets += ("credit_transactions_securities",)
+    return datasets
+
+
+def get_checkpoint(sink: BaseSink, path: str = None, datasets: tuple = ()) -> Checkpoint:
+    """
+    未指定路徑時存放於 stock/rawdata/.<sink>.<key>.checkpoint.json
+        - key 依 sink 的寫入目的地 (BaseSink.destination) 及啟用的資料種類產生
+        - 寫入另一個資料庫、檔案路徑或啟用更多資料時使用不同的 checkpoint，不會略過未寫入的日期
+    """
+    if path is None:
+        key = json.dumps([type(sink).__name__, sink.destination, list(datasets)], ensure_ascii=False)
+        digest = hashlib.sha1(key.encode("utf8")).hexdigest()[:12]
+        name = f".{type(sink).__name__.lower()}.{digest}.checkpoint.json"
+        path = os.path.join(file.create_rawdata_directory(), name)
+    return Checkpoint(path)
 
 
 class TaiwanStockClient:
@@ -22,7 +58,7 @@ class TaiwanStockClient:
     抓取台股上市上櫃之每日盤後行情及三大法人買賣超
 
     - 台灣證券交易所
-        1. rate limiting 設定，5秒內不能存取超過3次。建議至少延遲3秒，避免被ban。
+        1. rate limiting 設定，5秒內不能存取超過3次。各主機以共用的 token bucket 控制請求頻率，避免被ban。
         2. 每日收盤行情自 2004/02/11 開始提供資訊。
         3. 三大法人買賣超日報自 2012/05/02 起開始提供資訊。
         4. 融資融券餘額自民國 2001/01/01 起提供資訊。
@@ -42,7 +78,7 @@ class TaiwanStockClient:
         | `盤後行情` 、 `三大買人買賣超` 、 `融資融券餘額` | `2012/05/02` |
 
         1. 抓取日小於來源網站資訊提供日則 raise NotImplementedError
-        2. 抓取日若為國定假日則 print(date is holiday)
+        2. 抓取日若為國定假日則以 logging 記錄 (date is holiday)
     """
 
     def __init__(
@@ -52,103 +88,279 @@ class TaiwanStockClient:
         enable_fetch_institutional_investors: bool = False,
         enable_fetch_credit_transactions_securities: bool = False,
         sleep_second: int = 3,
+        session: requests.Session = None,
+        timeout: tuple = DEFAULT_TIMEOUT,
+        rate_limit: tuple = None,
+        concurrent: bool = False,
+        cache: ResponseCache = None,
+        columnar: bool = False,
+        typed: bool = False,
+        retry_policy: RetryPolicy = None,
     ):
+        """
+        sleep_second: 保留相容，請求間隔已改由 rate_limit 控制
+        session: 共用的連線池 session (見 adapter.session.create_session)，未指定時 TWSE、TPEX 共用一個
+        timeout: requests timeout，(連線秒數, 讀取秒數)
+        rate_limit: 每個主機 (請求次數, 秒數) 上限，預設 (3, 5)，同主機之所有 fetcher 共用
+        concurrent: 同時抓取 TWSE、TPEX 及各自的三種資料，結果順序與循序抓取相同
+        cache: 原始回應快取 (見 adapter.cache.ResponseCache)，已收盤日期重跑時不需連網
+        columnar: fetch 回傳 ColumnarResult (每個欄位一個 list)，迭代時仍逐筆產生 dict
+        typed: 價格轉為 float、數量轉為 int，缺值為 None (見 BaseFetcher.column_types)
+        retry_policy: 單一請求的重試策略 (見 box.retry.RetryPolicy)，預設指數退避加 jitter 並遵循 Retry-After
+        """
         self._version = version
+        self._concurrent = concurrent
+        self._columnar = columnar
+        self._databases = dict()
         enable_fetch_price = True
+        if session is None:
+            session = create_session()
 
         kwargs = locals().copy()
         kwargs.pop("self")
         kwargs.pop("version")
+        self._options = kwargs
         self.tpex = tpex.TPEXFetcher(**kwargs)
         self.twse = twse.TWSEFetcher(**kwargs)
 
-    def __create_directrory(self):
-        directrory = os.path.join(PATH, "rawdata")
-        if not os.path.isdir(directrory):
-            os.mkdir(directrory)
-        return directrory
+    def with_proxy_provider(self, proxy_provider) -> "TaiwanStockClient":
+        """相同設定 (共用 session、cache) 但使用另一個 proxy provider 的 client"""
+        options = dict(self._options, proxy_provider=proxy_provider)
+        options.pop("enable_fetch_price")
+        return TaiwanStockClient(self._version, **options)
 
     @monitor
-    def fetch(self, year: int, month: int, day: int, proxies=None) -> List[Dict]:
+    def fetch(self, year: int, month: int, day: int, proxies=None) -> List[Dict] or ColumnarResult:
+        if not self._concurrent:
+            results = [fetcher.fetch(year, month, day) for fetcher in (self.twse, self.tpex)]
+        else:
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                futures = [executor.submit(fetcher.fetch, year, month, day) for fetcher in (self.twse, self.tpex)]
+                results = [future.result() for future in futures]
+
+        if self._columnar:
+            return ColumnarResult.concat(results)
         rawdata = list()
-        rawdata += self.twse.fetch(year, month, day)
-        rawdata += self.tpex.fetch(year, month, day)
+        for result in results:
+            rawdata += result
         return rawdata
 
-    def fetch_to_csv(self, year: int, month: int, day: int, path: str = None, overwrite=True):
-        if path is None:
-            path = os.path.join(self.__create_directrory(), f"{year}{month:0>2}{day:0>2}.csv")
+    def fetch_range(
+        self,
+        start: datetime.date,
+        end: datetime.date,
+        sink: BaseSink = None,
+        checkpoint: str = None,
+        holidays: set = None,
+        processes: int = None,
+        proxies: list = None,
+    ) -> List[str]:
+        """
+        抓取 start ~ end (含) 之間每個交易日並寫入 sink
 
-        if not os.path.isfile(path) or overwrite is True:
-            rawdata = self.fetch(year, month, day)
+        - 略過週末及 box/holidays.json 所列之休市日 (可由 get_holidays_to_csv 更新)
+        - sink 確定寫入 (如 SQLSink 的 transaction commit) 後才寫入 checkpoint，重新執行時略過已完成的日期
+        - processes 不為 None 時，下載與解析分離，解析交由 process pool 處理 (見 pipeline.ParsePipeline)
+        - proxies 不為 None 時，各交易日分配至這些 proxy 平行抓取 (見 scheduler.ProxyScheduler)
+        - 回傳本次完成的日期
+        """
+        sink = file.CSVSink() if sink is None else sink
+        checkpoint = get_checkpoint(sink, checkpoint, get_datasets(self.twse))
+        today = datetime.date.today()
+
+        dates = [
+            date
+            for date in calendar.trading_days(start, end, holidays=holidays)
+            if date.strftime("%Y%m%d") not in checkpoint
+        ]
+        if processes is not None:
+            results = ParsePipeline(self, processes=processes).run(dates)
+        elif proxies is not None:
+            results = ProxyScheduler(self, proxies).run(dates)
+        else:
+            results = ((date, self.fetch(date.year, date.month, date.day)) for date in dates)
+
+        completed = []
+
+        def commit(committed):
+            for string_date in committed:
+                checkpoint.mark(string_date)
+            completed.extend(committed)
+
+        with sink:
+            for date, rawdata in results:
+                string_date = date.strftime("%Y%m%d")
+                if rawdata:
+                    with METRICS.timer("sink_write", sink=type(sink).__name__, date=string_date):
+                        commit(sink.write(string_date, rawdata))
+                elif date < today:
+                    commit([string_date])
+                # 當日資料可能尚未公布，不列入已完成
+            with METRICS.timer("sink_close", sink=type(sink).__name__):
+                commit(sink.close())
+        return completed
+
+    def iter_fetch(self, year: int, month: int, day: int) -> Iterator[Dict]:
+        """
+        依序抓取 TWSE、TPEX，每個交易所抓取完成即逐筆產生其資料，不需等待整日資料
+            - 各交易所個別重試 (見 monitor)，休市時不產生任何資料
+        """
+        for fetcher in (self.twse, self.tpex):
+            rows = monitor(type(fetcher).fetch)(fetcher, year, month, day)
+            if rows is None:
+                return
+            yield from rows
+
+    def fetch_to_csv(
+        self, year: int, month: int, day: int, path: str = None, overwrite=True, stream=False, compress=False
+    ):
+        """stream: 以 iter_fetch 逐筆寫入；compress: gzip 壓縮 (見 sink.file.FileSink)"""
+        sink = file.CSVSink(path, compress=compress)
+        date = f"{year}{month:0>2}{day:0>2}"
+        if not os.path.isfile(sink.get_path(date)) or overwrite is True:
+            rawdata = self.iter_fetch(year, month, day) if stream else self.fetch(year, month, day)
             if rawdata is not None:
-                with open(path, "w", encoding="utf8", newline="") as f:
-                    writer = csv.DictWriter(f, fieldnames=rawdata[0].keys())
-                    writer.writeheader()
-                    writer.writerows(rawdata)
+                sink.write(date, rawdata)
 
-    def fetch_to_json(self, year: int, month: int, day: int, path: str = None, overwrite=True):
-        if path is None:
-            path = os.path.join(self.__create_directrory(), f"{year}{month:0>2}{day:0>2}.json")
+    def fetch_to_ndjson(self, year: int, month: int, day: int, path: str = None, overwrite=True, compress=False):
+        """每行一筆 JSON，以 iter_fetch 逐筆寫入"""
+        sink = file.NDJSONSink(path, compress=compress)
+        date = f"{year}{month:0>2}{day:0>2}"
+        if not os.path.isfile(sink.get_path(date)) or overwrite is True:
+            sink.write(date, self.iter_fetch(year, month, day))
 
-        if not os.path.isfile(path) or overwrite is True:
+    def fetch_to_json(self, year: int, month: int, day: int, path: str = None, overwrite=True):
+        sink = file.JSONSink(path)
+        date = f"{year}{month:0>2}{day:0>2}"
+        if not os.path.isfile(sink.get_path(date)) or overwrite is True:
             rawdata = self.fetch(year, month, day)
             if rawdata is not None:
-                rawdata = {row["sid"]: row for row in rawdata}
-                with open(path, "w", encoding="utf8") as f:
-                    json.dump(obj=rawdata, fp=f, ensure_ascii=False, indent=4)
+                sink.write(date, rawdata)
 
-    def __bulk_insert(self, db, year, month, day):
-        models.StockInfo.bind(db)
-        models.StockInfo.create_table()
-        models.StockMarket.bind(db)
-        models.StockMarket.create_table()
+    def fetch_to_parquet(self, year: int, month: int, day: int, directory: str = None):
+        """寫入 Parquet (需安裝 pyarrow)，見 sink.parquet.ParquetSink"""
+        from .sink import parquet
 
+        rawdata = self.fetch(year, month, day)
+        if rawdata:
+            with parquet.ParquetSink(directory or parquet.PARQUET_PATH, fetcher=self.twse) as sink:
+                sink.write(f"{year}{month:0>2}{day:0>2}", rawdata)
+
+    def __bulk_insert(self, db, year, month, day, sink_class=sql.SQLSink):
         data = self.fetch(year, month, day)
-        if data:
-            rows = []
-            for row in data:
-                sid = row.pop("sid")
-                name = row.pop("name")
-                row["stock_id"] = sid
-                rows += [row]
-
-                try:
-                    info = models.StockInfo.get_by_id(pk=sid)
-                    if info.name != name:
-                        info.name = name
-                        info.save()
-                except models.StockInfo.DoesNotExist:
-                    models.StockInfo.create(id=sid, name=name)
-
-            models.StockMarket.delete().where(models.StockMarket.date == f"{year}{month:0>2}{day:0>2}").execute()
-            models.StockMarket.insert_many(rows).execute()
+        # 抓取期間不佔用連線，寫入後歸還連線池
+        with db.connection_context():
+            sink = sink_class(db)
+            if data:
+                string_date = f"{year}{month:0>2}{day:0>2}"
+                with METRICS.timer("sink_write", sink=type(sink).__name__, date=string_date):
+                    sink.write(string_date, data)
         return
 
     def fetch_to_sqlite(self, year: int, month: int, day: int, database_name=None):
-        db = SQLFactory.sqlite(**({"database_name": database_name} if database_name else {}))
+        db = SQLFactory.sqlite(fast_load=True, **({"database_name": database_name} if database_name else {}))
         self.__bulk_insert(db, year, month, day)
 
-    def fetch_to_mysql(self, year: int, month: int, day: int, database_name, host, user, password, port=3306):
-        # create mysql databse
-        try:
-            conn = pymysql.connect(host=host, user=user, password=password)
-            conn.cursor().execute(
-                f"CREATE DATABASE {database_name} default character set utf8mb4 collate utf8mb4_unicode_ci;"
+    def fetch_range_to_sqlite(
+        self,
+        start: datetime.date,
+        end: datetime.date,
+        database_name=None,
+        days_per_transaction: int = 20,
+        **kwargs,
+    ) -> List[str]:
+        """
+        以 SQLite 大量匯入設定 (WAL、synchronous=NORMAL 等) 執行 fetch_range
+            - 每 days_per_transaction 個交易日 commit 一次
+            - 匯入期間不維護 StockMarket 的索引，結束時再建立
+        """
+        db = SQLFactory.sqlite(fast_load=True, **({"database_name": database_name} if database_name else {}))
+        sink = sql.SQLSink(db, days_per_transaction=days_per_transaction, defer_index=True)
+        return self.fetch_range(start, end, sink=sink, **kwargs)
+
+    def get_mysql(self, database_name, host, user, password, port=3306):
+        """
+        回傳此 client 共用的 MySQL 連線池
+            - 資料庫僅於第一次取得時建立 (CREATE DATABASE)
+            - 資料表是否已建立由 SQLSink 記錄，之後不再執行 DDL
+        """
+        key = ("mysql", database_name, host, user, port)
+        if key not in self._databases:
+            conn = pymysql.connect(host=host, user=user, password=password, port=port)
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute(
+                        f"CREATE DATABASE IF NOT EXISTS {database_name} "
+                        "default character set utf8mb4 collate utf8mb4_unicode_ci;"
+                    )
+            finally:
+                conn.close()
+            self._databases[key] = SQLFactory.mysql(
+                database_name=database_name, host=host, user=user, password=password, port=port, pooled=True
             )
-        except pymysql.err.ProgrammingError:
-            pass
-        finally:
-            conn.close()
+        return self._databases[key]
 
-        db = SQLFactory.mysql(database_name=database_name, host=host, user=user, password=password, port=port)
+    def fetch_to_mysql(self, year: int, month: int, day: int, database_name, host, user, password, port=3306):
+        db = self.get_mysql(database_name, host, user, password, port)
         self.__bulk_insert(db, year, month, day)
 
-    def fetch_to_postgresql(self, database_obj):
-        raise NotImplementedError
+    def fetch_range_to_mysql(
+        self,
+        start: datetime.date,
+        end: datetime.date,
+        database_name,
+        host,
+        user,
+        password,
+        port=3306,
+        days_per_transaction: int = 20,
+        **kwargs,
+    ) -> List[str]:
+        """以共用的連線池執行 fetch_range，每 days_per_transaction 個交易日 commit 一次"""
+        db = self.get_mysql(database_name, host, user, password, port)
+        with db.connection_context():
+            sink = sql.SQLSink(db, days_per_transaction=days_per_transaction)
+            return self.fetch_range(start, end, sink=sink, **kwargs)
+
+    def close_databases(self):
+        """關閉連線池內所有連線"""
+        for db in self._databases.values():
+            db.close_all()
+        self._databases.clear()
+
+    def get_postgresql(self, database_name, host, user, password, port=5432):
+        """回傳此 client 共用的 PostgreSQL 連線池，資料庫需事先建立"""
+        key = ("postgresql", database_name, host, user, port)
+        if key not in self._databases:
+            self._databases[key] = SQLFactory.postgresql(
+                database_name=database_name, host=host, user=user, password=password, port=port, pooled=True
+            )
+        return self._databases[key]
+
+    def fetch_to_postgresql(self, year: int, month: int, day: int, database_name, host, user, password, port=5432):
+        db = self.get_postgresql(database_name, host, user, password, port)
+        self.__bulk_insert(db, year, month, day, sink_class=sql.PostgreSQLSink)
+
+    def fetch_range_to_postgresql(
+        self,
+        start: datetime.date,
+        end: datetime.date,
+        database_name,
+        host,
+        user,
+        password,
+        port=5432,
+        days_per_transaction: int = 20,
+        **kwargs,
+    ) -> List[str]:
+        """以 COPY FROM STDIN 大量匯入 (見 sink.sql.PostgreSQLSink)，每 days_per_transaction 個交易日 commit 一次"""
+        db = self.get_postgresql(database_name, host, user, password, port)
+        with db.connection_context():
+            sink = sql.PostgreSQLSink(db, days_per_transaction=days_per_transaction)
+            return self.fetch_range(start, end, sink=sink, **kwargs)
 
     def get_holidays_to_csv(self):
-        with open(os.path.join(PATH, "box", "holidays.json"), "w+") as f:
+        with open(calendar.HOLIDAYS_PATH, "w+", encoding="utf8") as f:
             json.dump(
                 obj={"update": str(datetime.datetime.now()), "total": self.twse.get_holidays()},
                 fp=f,
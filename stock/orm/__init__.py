@@ -1,19 +1,56 @@
 import peewee
+from playhouse.pool import PooledMySQLDatabase
+from playhouse.pool import PooledPostgresqlDatabase
 
+from . import migrate
 from . import models
 
-__all__ = [models]
+__all__ = [migrate, models]
+
+
+# 大量匯入用：WAL 及 synchronous=NORMAL 不再每個 transaction fsync，快取 64MB、mmap 256MB、暫存表置於記憶體
+SQLITE_FAST_LOAD_PRAGMAS = (
+    ("journal_mode", "wal"),
+    ("synchronous", "normal"),
+    ("cache_size", -64 * 1024),
+    ("mmap_size", 256 * 1024 * 1024),
+    ("temp_store", "memory"),
+)
 
 
 class SQLFactory:
     @classmethod
-    def sqlite(cls, database_name="sqlite.db"):
-        return peewee.SqliteDatabase(database_name)
+    def sqlite(cls, database_name="sqlite.db", fast_load=False):
+        return peewee.SqliteDatabase(database_name, pragmas=SQLITE_FAST_LOAD_PRAGMAS if fast_load else ())
 
     @classmethod
-    def mysql(cls, database_name, host, user, password, port=3306):
+    def mysql(cls, database_name, host, user, password, port=3306, pooled=False, max_connections=8, stale_timeout=300):
+        """pooled: 使用 playhouse.pool 連線池，close 時連線歸還而不斷線，閒置超過 stale_timeout 秒才重新連線"""
+        if pooled:
+            return PooledMySQLDatabase(
+                database=database_name,
+                host=host,
+                user=user,
+                passwd=password,
+                port=port,
+                max_connections=max_connections,
+                stale_timeout=stale_timeout,
+            )
         return peewee.MySQLDatabase(database=database_name, host=host, user=user, passwd=password, port=port)
 
     @classmethod
-    def postgresql(cls, database_name, host, user, password, port=3306):
-        return peewee.PostgresqlDatabase(database=database_name, host=host, user=user, passwd=password, port=port)
+    def postgresql(
+        cls, database_name, host, user, password, port=5432, pooled=False, max_connections=8, stale_timeout=300
+    ):
+        """pooled: 同 mysql，使用 playhouse.pool 連線池"""
+        if pooled:
+            return PooledPostgresqlDatabase(
+                database=database_name,
+                host=host,
+                user=user,
+                password=password,
+                port=port,
+                max_connections=max_connections,
+                stale_timeout=stale_timeout,
+            )
+        return peewee.PostgresqlDatabase(database=database_name, host=host, user=user, password=password, port=port)
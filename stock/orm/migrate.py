@@ -0,0 +1,54 @@
+import peewee
+from playhouse import migrate as _migrate
+
+from . import models
+
+
+def get_index_names(model) -> list:
+    return [index.name for index in model._meta.database.get_indexes(model._meta.table_name)]
+
+
+def get_unique_index_name(model) -> str:
+    return next(index._name for index in model._meta.fields_to_index() if index._unique)
+
+
+def deduplicate_stock_market() -> int:
+    """刪除 (stock_id, date) 重複的資料，保留 id 最大者 (即最後寫入者)，回傳刪除筆數"""
+    keep = (
+        models.StockMarket.select(peewee.fn.MAX(models.StockMarket.id).alias("id"))
+        .group_by(models.StockMarket.stock, models.StockMarket.date)
+        .alias("keep")
+    )
+    # MySQL 不允許子查詢直接引用刪除中的資料表，以衍生資料表包裝
+    query = peewee.Select(from_list=[keep], columns=[keep.c.id])
+    return models.StockMarket.delete().where(models.StockMarket.id.not_in(query)).execute()
+
+
+def migrate_note_column() -> bool:
+    """舊版 StockMarket.note 為 BIGINT，改為文字欄位 (SQLite 不限制欄位型別，不需變更)"""
+    db = models.StockMarket._meta.database
+    if isinstance(db, peewee.SqliteDatabase):
+        return False
+    table = models.StockMarket._meta.table_name
+    columns = {column.name: column for column in db.get_columns(table)}
+    if "int" not in columns[models.StockMarket.note.column_name].data_type.lower():
+        return False
+    migrator = _migrate.SchemaMigrator.from_database(db)
+    _migrate.migrate(migrator.alter_column_type(table, models.StockMarket.note.column_name, models.StockMarket.note))
+    return True
+
+
+def create_tables():
+    """
+    建立 (已 bind 的) 資料表，並將既有資料庫更新至目前的 schema
+        - StockMarket 新增 (stock_id, date) 唯一索引前，先刪除重複的資料
+        - StockMarket.note 由 BIGINT 改為文字
+    """
+    models.StockInfo.create_table()
+    if models.StockMarket.table_exists():
+        migrate_note_column()
+        if get_unique_index_name(models.StockMarket) not in get_index_names(models.StockMarket):
+            with models.StockMarket._meta.database.atomic():
+                deduplicate_stock_market()
+                models.StockMarket._schema.create_indexes(safe=True)
+    models.StockMarket.create_table()
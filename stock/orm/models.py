@@ -44,7 +44,12 @@ class StockMarket(peewee.Model):
     short_today_balance = peewee.BigIntegerField(null=True)
     short_quota = peewee.BigIntegerField(null=True)
     offsetting_margin_short = peewee.BigIntegerField(null=True)
-    note = peewee.BigIntegerField(null=True)
+    # 註記為文字，如 "OX"、"@"、"11   A"
+    note = peewee.CharField(max_length=64, null=True)
 
     class meta:
         table_name = "stock_market"
+
+
+# 每檔股票每日僅一筆，供 upsert 判斷衝突，並讓單一股票的歷史查詢走索引
+StockMarket.add_index(StockMarket.stock, StockMarket.date, unique=True)
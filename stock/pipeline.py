@@ -0,0 +1,115 @@
+import collections
+from concurrent.futures import ProcessPoolExecutor
+import datetime
+import logging
+import os
+from typing import Iterator, List, Tuple
+
+from .adapter.base import RawResponse
+from .adapter.columnar import ColumnarResult
+from .box.exceptions import HolidayWarning
+
+logger = logging.getLogger(__name__)
+
+# 每個 worker process 依設定重建並保留 fetcher
+_FETCHERS = dict()
+
+
+def _get_fetcher(fetcher_class, options: tuple):
+    key = (fetcher_class, options)
+    if key not in _FETCHERS:
+        _FETCHERS[key] = fetcher_class(proxy_provider=None, sleep_second=0, **dict(options))
+    return _FETCHERS[key]
+
+
+def parse(fetcher_class, options: tuple, date: str, responses: List[RawResponse]) -> list:
+    """於 worker process 解析單一交易所單日的三種資料並 combine"""
+    fetcher = _get_fetcher(fetcher_class, options)
+    price, institutional_investors, credit_transactions_securities = [
+        None if route is None else route.parse(date, resp) for route, resp in zip(fetcher.routes(date), responses)
+    ]
+    return fetcher.assemble(date, price, institutional_investors, credit_transactions_securities)
+
+
+class ParsePipeline:
+    """
+    下載與解析分離的批次抓取
+        - 主行程依序下載 (或讀取快取)，仍受各主機 rate limit 限制
+        - 解析 (HTML/JSON、clean、combine) 分送至 process pool
+        - 最多 prefetch 個交易日同時解析，結果依日期順序回傳
+    """
+
+    def __init__(self, client, processes: int = None, prefetch: int = None):
+        self.client = client
+        self.fetchers = [client.twse, client.tpex]
+        self.processes = processes
+        self.prefetch = prefetch
+
+    def download(self, fetcher, date: str):
+        routes = fetcher.routes(date)
+        responses, fresh = [], []
+        for route in routes:
+            resp = None if route is None else fetcher.load_cache(date, route)
+            fresh += [route is not None and resp is None]
+            if fresh[-1]:
+                resp = RawResponse.from_response(fetcher._retry_policy.call(fetcher.get, route.url, route.params))
+            responses += [resp]
+        return routes, responses, fresh
+
+    def submit(self, executor, date: datetime.date):
+        string_date = date.strftime("%Y%m%d")
+        jobs = []
+        for fetcher in self.fetchers:
+            routes, responses, fresh = self.download(fetcher, string_date)
+            options = (
+                ("enable_fetch_price", fetcher._enable_fetch_price),
+                ("enable_fetch_institutional_investors", fetcher._enable_fetch_institutional_investors),
+                ("enable_fetch_credit_transactions_securities", fetcher._enable_fetch_credit_transactions_securities),
+                ("typed", fetcher._typed),
+                ("columnar", fetcher._columnar),
+            )
+            future = executor.submit(parse, type(fetcher), options, string_date, responses)
+            jobs += [(fetcher, routes, responses, fresh, future)]
+        return date, jobs
+
+    def result(self, date: datetime.date, jobs: list):
+        string_date = date.strftime("%Y%m%d")
+        try:
+            results = [future.result() for fetcher, routes, responses, fresh, future in jobs]
+        except HolidayWarning as e:
+            logger.info(e)
+            for fetcher, routes, responses, fresh, future in jobs:
+                for route, resp, is_fresh in zip(routes, responses, fresh):
+                    if is_fresh:
+                        fetcher.store_cache(string_date, route, resp, holiday=True)
+            return None
+        except ConnectionError as e:
+            # 資料不完整，改由 TaiwanStockClient.fetch 重新下載並重試
+            logger.warning('%s: "%s"', type(e).__name__, e)
+            return self.client.fetch(date.year, date.month, date.day)
+
+        for fetcher, routes, responses, fresh, future in jobs:
+            for route, resp, is_fresh in zip(routes, responses, fresh):
+                if is_fresh:
+                    fetcher.store_cache(string_date, route, resp)
+
+        # 與 TaiwanStockClient.fetch 相同的合併方式
+        if self.client._columnar:
+            return ColumnarResult.concat(results)
+        rawdata = []
+        for result in results:
+            rawdata += result
+        return rawdata
+
+    def run(self, dates) -> Iterator[Tuple[datetime.date, list]]:
+        prefetch = self.prefetch or (self.processes or os.cpu_count() or 1) * 2
+        with ProcessPoolExecutor(max_workers=self.processes) as executor:
+            window = collections.deque()
+            for date in dates:
+                window.append(self.submit(executor, date))
+                if len(window) >= prefetch:
+                    date, jobs = window.popleft()
+                    yield date, self.result(date, jobs)
+            while window:
+                date, jobs = window.popleft()
+                yield date, self.result(date, jobs)
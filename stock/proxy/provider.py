@@ -1,5 +1,7 @@
 import abc
 from itertools import cycle
+import threading
+import time
 
 
 class ProxyProvider(abc.ABC):
@@ -7,6 +9,10 @@ class ProxyProvider(abc.ABC):
     def get_proxy(self):
         return NotImplemented
 
+    def report(self, proxy, latency: float = None, status_code: int = None, error: Exception = None):
+        """每次請求後由 fetcher 回報結果，預設不處理"""
+        pass
+
 
 class NoProxyProvier(ProxyProvider):
     def get_proxy(self):
@@ -40,3 +46,84 @@ class RoundRobinProxiesProvider(ProxyProvider):
 
     def get_proxy(self):
         return next(self._proxies_cycle)
+
+
+class ProxyHealth:
+    def __init__(self, proxy):
+        self.proxy = proxy
+        self.latency = None
+        self.failures = 0
+        self.quarantined_until = 0
+
+
+class HealthAwareProxiesProvider(ProxyProvider):
+    """
+    依各 proxy 的延遲及失敗紀錄選擇
+
+    - 延遲以指數移動平均 (alpha) 記錄，於健康的 proxy 中延遲最低的 top 個輪流使用，尚未量測者優先
+    - 連線失敗或遭封鎖 (BAN_STATUS) 時隔離 base_quarantine * 2 ** (連續失敗次數 - 1) 秒，上限 max_quarantine
+    - 成功一次即清除失敗次數；全部隔離時使用最早解除隔離者
+    """
+
+    BAN_STATUS = (403, 407, 429)
+
+    def __init__(
+        self, proxies: list, top: int = 5, alpha: float = 0.3, base_quarantine: float = 30, max_quarantine: float = 1800
+    ):
+        self._top = top
+        self._alpha = alpha
+        self._base_quarantine = base_quarantine
+        self._max_quarantine = max_quarantine
+        self._lock = threading.Lock()
+        self._count = 0
+        self.proxies = proxies
+
+    @property
+    def proxies(self):
+        return [health.proxy for health in self._health.values()]
+
+    @proxies.setter
+    def proxies(self, proxies: list):
+        if not isinstance(proxies, list):
+            raise ValueError("Proxies only accept list")
+
+        with self._lock:
+            self._health = {self.get_key(proxy): ProxyHealth(proxy) for proxy in proxies}
+
+    @property
+    def health(self) -> dict:
+        return self._health
+
+    def get_key(self, proxy):
+        return tuple(sorted(proxy.items())) if isinstance(proxy, dict) else proxy
+
+    def get_proxy(self):
+        now = time.monotonic()
+        with self._lock:
+            healthy = [health for health in self._health.values() if health.quarantined_until <= now]
+            if not healthy:
+                return min(self._health.values(), key=lambda health: health.quarantined_until).proxy
+
+            healthy.sort(key=lambda health: -1 if health.latency is None else health.latency)
+            candidates = healthy[: self._top]
+            self._count += 1
+            return candidates[self._count % len(candidates)].proxy
+
+    def report(self, proxy, latency: float = None, status_code: int = None, error: Exception = None):
+        with self._lock:
+            health = self._health.get(self.get_key(proxy))
+            if health is None:
+                return
+
+            if error is not None or status_code in self.BAN_STATUS:
+                health.failures += 1
+                backoff = self._base_quarantine * 2 ** (health.failures - 1)
+                health.quarantined_until = time.monotonic() + min(backoff, self._max_quarantine)
+                return
+
+            health.failures = 0
+            if latency is not None:
+                if health.latency is None:
+                    health.latency = latency
+                else:
+                    health.latency = self._alpha * latency + (1 - self._alpha) * health.latency
@@ -1,59 +1,95 @@
+from concurrent.futures import as_completed
+from concurrent.futures import ThreadPoolExecutor
 import datetime as dt
 import json
+import logging
 import os
+import time
 
 import lxml.html
 import requests
 
+logger = logging.getLogger(__name__)
+
 JSON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "_setting.json")
 
 
 class FreeProxy:
-    def __init__(self, country_id=[], timeout=0.5):
+    def __init__(self, country_id=[], timeout=0.5, check_url="http://www.google.com", max_workers=20, path=JSON_PATH):
+        """
+        check_url: 驗證用的目標網址，測試時可改為本機伺服器
+        max_workers: 同時驗證的 proxy 數量上限
+        path: update 寫入的設定檔
+        """
         self.country_id = country_id
         self.timeout = timeout
+        self.check_url = check_url
+        self.max_workers = max_workers
+        self.path = path
 
     def __check(self, proxies):
-        with requests.get("http://www.google.com", proxies=proxies, timeout=self.timeout, stream=True) as r:
+        """經由 proxy 連線成功 (對方位址即 proxy) 時回傳延遲秒數，否則回傳 None"""
+        start = time.monotonic()
+        with requests.get(self.check_url, proxies=proxies, timeout=self.timeout, stream=True) as r:
             if r.raw.connection.sock:
                 if r.raw.connection.sock.getpeername()[0] == proxies["http"].split(":")[1][2:]:
-                    return True
+                    return time.monotonic() - start
 
-    def download(self):
+    def get_candidates(self):
         page = requests.get("https://www.sslproxies.org")
         doc = lxml.html.fromstring(page.content)
         tr_elements = doc.xpath('//*[@id="proxylisttable"]//tr')
         if not self.country_id:
-            proxies_array = [
-                f"{tr_elements[i][0].text_content()}:{tr_elements[i][1].text_content()}" for i in range(1, 101)
-            ]
-        else:
-            proxies_array = [
-                f"{tr_elements[i][0].text_content()}:{tr_elements[i][1].text_content()}"
-                for i in range(1, 101)
-                if tr_elements[i][2].text_content() in self.country_id
-            ]
-        results = []
-        for address in proxies_array:
-            try:
-                proxies = {"http": f"http://{address}"}
-                if self.__check(proxies=proxies):
-                    results += [proxies]
-            except requests.exceptions.RequestException as e:
-                print("\n", e)
-        return results
+            return [f"{tr_elements[i][0].text_content()}:{tr_elements[i][1].text_content()}" for i in range(1, 101)]
+        return [
+            f"{tr_elements[i][0].text_content()}:{tr_elements[i][1].text_content()}"
+            for i in range(1, 101)
+            if tr_elements[i][2].text_content() in self.country_id
+        ]
+
+    def validate(self, addresses: list, path: str = None) -> list:
+        """
+        以 thread pool 同時驗證，最多 max_workers 個同時連線
+            - 回傳可用的 proxy，依延遲由低至高排序
+            - 指定 path 時，每驗證成功一個即依目前排名寫入，中途中止仍保留已驗證的結果
+        """
+        latencies = dict()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.__check, {"http": f"http://{address}"}): address for address in addresses}
+            for future in as_completed(futures):
+                try:
+                    latency = future.result()
+                except requests.exceptions.RequestException as e:
+                    logger.debug("%s: %s", futures[future], e)
+                    continue
+                if latency is not None:
+                    latencies[f"http://{futures[future]}"] = latency
+                    if path is not None:
+                        self.save(latencies, path)
+        return [{"http": address} for address in sorted(latencies, key=latencies.get)]
+
+    def save(self, latencies: dict, path: str = None):
+        path = self.path if path is None else path
+        tmp = f"{path}.tmp"
+        with open(tmp, "w+", encoding="utf8") as f:
+            json.dump(
+                obj={
+                    "updated_at": str(dt.datetime.now()),
+                    "http": sorted(latencies, key=latencies.get),
+                    "latency": {address: round(latencies[address], 4) for address in latencies},
+                },
+                fp=f,
+                ensure_ascii=False,
+                indent=4,
+            )
+        os.replace(tmp, path)
+
+    def download(self):
+        return self.validate(self.get_candidates())
 
     def get(self):
-        with open(JSON_PATH, "r", encoding="utf8") as f:
+        with open(self.path, "r", encoding="utf8") as f:
             return list(map(lambda row: {"http": row}, json.load(f)["http"]))
 
     def update(self):
-        response = self.download()
-        if response != []:
-            with open(JSON_PATH, "w+", encoding="utf8") as f:
-                json.dump(
-                    obj={"updated_at": str(dt.datetime.now()), "http": [f["http"] for f in response]},
-                    fp=f,
-                    ensure_ascii=False,
-                    indent=4,
-                )
+        return self.validate(self.get_candidates(), path=self.path)
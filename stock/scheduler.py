@@ -0,0 +1,121 @@
+import collections
+from concurrent.futures import ThreadPoolExecutor
+import datetime
+import logging
+import queue
+import threading
+from typing import Iterator, Tuple
+
+import requests
+
+from .box.exceptions import ThrottledError
+from .box.retry import RetryPolicy
+from .proxy import provider
+
+logger = logging.getLogger(__name__)
+
+
+class ProxyScheduler:
+    """
+    將交易日分配至多個 proxy 平行抓取
+        - 每個 proxy 一個 client (SingleProxyProvider)，rate limit 依 (主機, proxy) 各自計算，處理量約隨 proxy 數量倍增
+        - 每個 proxy 同時最多處理 workers_per_proxy 個交易日，空閒的 proxy 即取得下一個交易日
+        - 最多 prefetch 個交易日同時抓取，結果依日期順序回傳
+        - proxy 本身的錯誤 (PROXY_EXCEPTIONS) 時，該交易日改由其他 proxy 抓取，proxy 依 retry_policy 等待後再使用
+        - 同一 proxy 連續失敗超過 retry_policy.max_retries 次即不再使用，所有 proxy 皆停用才 raise
+        - 其他錯誤 (如資料為空、5xx) 與 proxy 無關，直接 raise
+    """
+
+    # 僅此類錯誤歸咎於 proxy
+    PROXY_EXCEPTIONS = (requests.exceptions.ProxyError, requests.exceptions.ConnectTimeout, ThrottledError)
+
+    def __init__(
+        self,
+        client,
+        proxies: list,
+        workers_per_proxy: int = 1,
+        prefetch: int = None,
+        retry_policy: RetryPolicy = None,
+    ):
+        self.proxies = proxies
+        self.clients = [client.with_proxy_provider(provider.SingleProxyProvider(proxy)) for proxy in proxies]
+        self.workers_per_proxy = workers_per_proxy
+        self.prefetch = prefetch
+        self.retry_policy = RetryPolicy(backoff_factor=5, max_backoff=60) if retry_policy is None else retry_policy
+        self._lock = threading.Lock()
+        self._failures = dict()
+        self._retired = set()
+        self._slots = 0
+
+    def discard(self, idle: queue.Queue):
+        """移除 client 的一個空位，全部移除後放入 None 通知其他等待中的交易日"""
+        with self._lock:
+            self._slots -= 1
+            if self._slots == 0:
+                idle.put(None)
+
+    def release(self, idle: queue.Queue, client, error: Exception):
+        """proxy 失敗後暫停使用，等待後放回；連續失敗過多則停用"""
+        proxy = self.proxies[self.clients.index(client)]
+        with self._lock:
+            failures = self._failures[id(client)] = self._failures.get(id(client), 0) + 1
+        if failures > self.retry_policy.max_retries:
+            logger.warning('proxy %s retired, %s: "%s"', proxy, type(error).__name__, error)
+            self._retired.add(id(client))
+            self.discard(idle)
+            return
+        delay = self.retry_policy.get_delay(failures - 1, getattr(error, "retry_after", None))
+        logger.warning('proxy %s failed, %s: "%s", resume in %.1fs', proxy, type(error).__name__, error, delay)
+        timer = threading.Timer(delay, idle.put, [client])
+        timer.daemon = True
+        timer.start()
+
+    def fetch(self, idle: queue.Queue, date: datetime.date):
+        while True:
+            client = idle.get()
+            if client is None:
+                idle.put(None)
+                raise ConnectionError(f"all proxies failed, {date} is not fetched")
+            if id(client) in self._retired:
+                self.discard(idle)
+                continue
+
+            try:
+                rawdata = client.fetch(date.year, date.month, date.day)
+            except self.PROXY_EXCEPTIONS as e:
+                # 改由其他 proxy 抓取此交易日
+                self.release(idle, client, e)
+                continue
+            except BaseException:
+                idle.put(client)
+                raise
+            with self._lock:
+                self._failures.pop(id(client), None)
+            idle.put(client)
+            return rawdata
+
+    def run(self, dates) -> Iterator[Tuple[datetime.date, list]]:
+        idle = queue.Queue()
+        for client in self.clients * self.workers_per_proxy:
+            idle.put(client)
+        workers = idle.qsize()
+        prefetch = self.prefetch or workers * 2
+        self._failures.clear()
+        self._retired.clear()
+        self._slots = workers
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            window = collections.deque()
+            try:
+                for date in dates:
+                    window.append((date, executor.submit(self.fetch, idle, date)))
+                    if len(window) >= prefetch:
+                        date, future = window.popleft()
+                        yield date, future.result()
+                while window:
+                    date, future = window.popleft()
+                    yield date, future.result()
+            finally:
+                # 中止時不再抓取尚未開始的交易日
+                for date, future in window:
+                    future.cancel()
@@ -0,0 +1,29 @@
+import abc
+from typing import Dict, List
+
+
+class BaseSink(abc.ABC):
+    """
+    抓取結果的輸出目的地，每個交易日呼叫一次 write
+
+    - write 及 close 回傳已確定寫入 (可列入 checkpoint) 的日期
+    - 批次寫入的 sink 可暫緩回傳，待 commit 後一併回傳
+    """
+
+    @abc.abstractmethod
+    def write(self, date: str, rawdata: List[Dict]) -> List[str]:
+        return NotImplemented
+
+    def close(self) -> List[str]:
+        return []
+
+    @property
+    def destination(self) -> str:
+        """寫入目的地 (檔案路徑、資料庫等)，用於區分預設的 checkpoint"""
+        return ""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
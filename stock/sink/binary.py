@@ -0,0 +1,194 @@
+import datetime
+import json
+import os
+from typing import Dict, List
+
+import numpy as np
+
+from ..adapter import twse
+from .base import BaseSink
+from .file import RAWDATA_PATH
+
+BINARY_PATH = os.path.join(RAWDATA_PATH, "binary")
+RECORDS_FILENAME = "records.bin"
+INDEX_FILENAME = "index.npz"
+META_FILENAME = "meta.json"
+
+
+def get_fields(fetcher) -> List[str]:
+    """fetcher 所有數值欄位 (開高低收量、三大法人、融資融券)，不論是否啟用，確保每筆長度固定"""
+    columns = fetcher.price_columns + fetcher.institutional_investors_columns
+    columns += fetcher.credit_transactions_securities_columns
+    return [name for name in columns if name in fetcher.column_types]
+
+
+def get_dtype(fields: List[str]) -> np.dtype:
+    # 數值一律以 float64 存放，缺值為 NaN
+    return np.dtype([("date", "<i4"), ("category", "<i1"), ("sid", "S8")] + [(name, "<f8") for name in fields])
+
+
+def to_int_date(date) -> int:
+    if isinstance(date, (datetime.date, datetime.datetime)):
+        date = date.strftime("%Y%m%d")
+    return int(date)
+
+
+class BinarySink(BaseSink):
+    """
+    僅能附加的固定長度二進位檔，每筆 = date、category、sid 及所有數值欄位 (見 PriceStore)
+
+    - 依日期遞增附加，與最後一日相同的日期直接略過，重跑不會重複
+    - 早於最後一日的日期 raise ValueError，不會略過後仍回報為已寫入 (fetch_range 依日期順序寫入)
+    - 每日寫入後 flush，close 時重建 sid 索引
+    """
+
+    def __init__(self, directory: str = BINARY_PATH, fetcher=None):
+        """
+        fetcher: 提供欄位及轉換 (BaseFetcher.column_types、convert)，預設為 TWSEFetcher
+        """
+        self.directory = directory
+        self.fetcher = twse.TWSEFetcher(None, True, False, False, 0) if fetcher is None else fetcher
+        os.makedirs(directory, exist_ok=True)
+
+        meta_path = os.path.join(directory, META_FILENAME)
+        if os.path.isfile(meta_path):
+            with open(meta_path, encoding="utf8") as f:
+                self.fields = json.load(f)["fields"]
+        else:
+            self.fields = get_fields(self.fetcher)
+            with open(meta_path, "w", encoding="utf8") as f:
+                json.dump({"fields": self.fields}, f)
+        self.dtype = get_dtype(self.fields)
+
+        self.path = os.path.join(directory, RECORDS_FILENAME)
+        size = os.path.getsize(self.path) if os.path.isfile(self.path) else 0
+        if size % self.dtype.itemsize:
+            # 寫入中途中止留下的不完整 record
+            os.truncate(self.path, size - size % self.dtype.itemsize)
+        self._last_date = self.get_last_date()
+        self._file = None
+
+    @property
+    def destination(self) -> str:
+        return os.path.abspath(self.directory)
+
+    def get_last_date(self) -> int:
+        size = os.path.getsize(self.path) if os.path.isfile(self.path) else 0
+        if size == 0:
+            return 0
+        with open(self.path, "rb") as f:
+            f.seek(size - self.dtype.itemsize)
+            return int(np.frombuffer(f.read(self.dtype.itemsize), dtype=self.dtype)["date"][0])
+
+    def to_records(self, rawdata: List[Dict]) -> np.ndarray:
+        rawdata = list(rawdata)
+        records = np.zeros(len(rawdata), dtype=self.dtype)
+        records["date"] = [to_int_date(row["date"]) for row in rawdata]
+        records["category"] = [int(row["category"]) for row in rawdata]
+        records["sid"] = [row["sid"].encode("ascii") for row in rawdata]
+        types = self.fetcher.column_types
+        for name in self.fields:
+            values = [self.fetcher.convert(row.get(name), types[name], strict=True) for row in rawdata]
+            records[name] = [np.nan if value is None else value for value in values]
+        return records
+
+    def write(self, date: str, rawdata: List[Dict]) -> List[str]:
+        if to_int_date(date) == self._last_date:
+            return [date]
+        if to_int_date(date) < self._last_date:
+            raise ValueError(f"BinarySink only appends in date order, {date} is earlier than {self._last_date}")
+        if self._file is None:
+            self._file = open(self.path, "ab")
+        self._file.write(self.to_records(rawdata).tobytes())
+        self._file.flush()
+        self._last_date = to_int_date(date)
+        return [date]
+
+    def close(self) -> List[str]:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            PriceStore(self.directory).build_index()
+        return []
+
+
+class PriceStore:
+    """
+    BinarySink 的讀取端，以 np.memmap 直接對應檔案，不需載入或解析
+
+    - records: 所有資料之 structured array (zero-copy)，例: store.records["close"]
+    - sid 索引 (index.npz) 依 sid 排序之 record 位置，單一股票查詢只需讀取該股票的資料
+    - 例: store.get("2330", start="20100101")["close"]
+    """
+
+    def __init__(self, directory: str = BINARY_PATH):
+        self.directory = directory
+        with open(os.path.join(directory, META_FILENAME), encoding="utf8") as f:
+            self.fields = json.load(f)["fields"]
+        self.dtype = get_dtype(self.fields)
+        self.path = os.path.join(directory, RECORDS_FILENAME)
+        self.index_path = os.path.join(directory, INDEX_FILENAME)
+        self._records = None
+        self._index = None
+
+    @property
+    def records(self) -> np.ndarray:
+        if self._records is None:
+            size = os.path.getsize(self.path) if os.path.isfile(self.path) else 0
+            count = size // self.dtype.itemsize
+            if count == 0:
+                self._records = np.empty(0, dtype=self.dtype)
+            else:
+                self._records = np.memmap(self.path, dtype=self.dtype, mode="r", shape=(count,))
+        return self._records
+
+    def build_index(self) -> dict:
+        """依 sid 穩定排序 record 位置 (同一股票內維持日期順序)，存為 CSR 格式：sids、starts、offsets"""
+        sids = self.records["sid"]
+        offsets = np.argsort(sids, kind="stable")
+        unique, starts = np.unique(sids[offsets], return_index=True)
+        index = {
+            "sids": unique,
+            "starts": np.append(starts, len(offsets)),
+            "offsets": offsets,
+            "count": np.array(len(sids)),
+        }
+        tmp = f"{self.index_path}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, **index)
+        os.replace(tmp, self.index_path)
+        self._index = index
+        return index
+
+    @property
+    def index(self) -> dict:
+        if self._index is None:
+            if os.path.isfile(self.index_path):
+                with np.load(self.index_path) as data:
+                    index = {name: data[name] for name in data.files}
+                # 索引建立後又附加了資料 (如寫入中途中止)，重新建立
+                self._index = index if int(index["count"]) == len(self.records) else None
+            if self._index is None:
+                self._index = self.build_index()
+        return self._index
+
+    @property
+    def sids(self) -> List[str]:
+        return [sid.decode("ascii") for sid in self.index["sids"]]
+
+    def get_offsets(self, sid: str) -> np.ndarray:
+        index = self.index
+        key = sid.encode("ascii")
+        i = np.searchsorted(index["sids"], key)
+        if i == len(index["sids"]) or index["sids"][i] != key:
+            return index["offsets"][:0]
+        start, end = index["starts"][i], index["starts"][i + 1]
+        return index["offsets"][start:end]
+
+    def get(self, sid: str, start=None, end=None) -> np.ndarray:
+        """單一股票 start ~ end (含) 的資料，日期可為 YYYYMMDD 字串或 datetime.date"""
+        offsets = self.get_offsets(sid)
+        dates = self.records["date"][offsets]
+        left = 0 if start is None else np.searchsorted(dates, to_int_date(start), side="left")
+        right = len(dates) if end is None else np.searchsorted(dates, to_int_date(end), side="right")
+        return self.records[offsets[left:right]]
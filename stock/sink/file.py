@@ -0,0 +1,122 @@
+import abc
+import csv
+import gzip
+import itertools
+import json
+import os
+from typing import Dict, Iterable, Iterator, List
+
+from .base import BaseSink
+
+RAWDATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "rawdata")
+
+
+def create_rawdata_directory():
+    if not os.path.isdir(RAWDATA_PATH):
+        os.mkdir(RAWDATA_PATH)
+    return RAWDATA_PATH
+
+
+class FileSink(BaseSink):
+    EXTENSION = None
+
+    def __init__(self, path: str = None, compress: bool = False, append: bool = False):
+        """
+        path: 輸出檔案路徑，可含 `{date}` 以每日一檔輸出，預設為 stock/rawdata/{date}.<extension>
+        compress: 以 gzip 壓縮，預設路徑加上 .gz
+        append: 附加至既有檔案並於 close 前保持開啟，path 不含 `{date}` 時即為單一檔案存放整段日期
+
+        非 append 時先寫入 <path>.tmp，完成後才取代目的檔案，rawdata 中途失敗 (如 iter_fetch 重試用盡) 不會留下不完整的檔案
+        """
+        if path is None:
+            path = os.path.join(create_rawdata_directory(), "{date}." + self.EXTENSION + (".gz" if compress else ""))
+        self.path = path
+        self.compress = compress
+        self.append = append
+        self._file = None
+        self._file_path = None
+        self._header = False
+
+    @property
+    def destination(self) -> str:
+        return os.path.abspath(self.path)
+
+    def get_path(self, date: str):
+        return self.path.replace("{date}", date)
+
+    def open_file(self, path: str, mode: str):
+        if self.compress:
+            return gzip.open(path, mode + "t", encoding="utf8", newline="")
+        return open(path, mode, encoding="utf8", newline="")
+
+    @abc.abstractmethod
+    def write_rows(self, f, first: Dict, rows: Iterator[Dict], header: bool):
+        raise NotImplementedError
+
+    def write(self, date: str, rawdata: Iterable[Dict]) -> List[str]:
+        """逐筆寫入，rawdata 可為 generator (見 TaiwanStockClient.iter_fetch)，沒有資料時不建立檔案"""
+        rows = iter(rawdata)
+        first = next(rows, None)
+        if first is None:
+            return []
+
+        path = self.get_path(date)
+        if not self.append:
+            tmp = f"{path}.tmp"
+            try:
+                with self.open_file(tmp, "w") as f:
+                    self.write_rows(f, first, rows, header=True)
+            except BaseException:
+                os.remove(tmp)
+                raise
+            os.replace(tmp, path)
+            return [date]
+
+        if self._file_path != path:
+            self.close()
+            self._header = not os.path.isfile(path) or os.path.getsize(path) == 0
+            self._file, self._file_path = self.open_file(path, "a"), path
+        self.write_rows(self._file, first, rows, header=self._header)
+        self._header = False
+        self._file.flush()
+        return [date]
+
+    def close(self) -> List[str]:
+        if self._file is not None:
+            self._file.close()
+            self._file, self._file_path = None, None
+        return []
+
+
+class CSVSink(FileSink):
+    EXTENSION = "csv"
+
+    def write_rows(self, f, first: Dict, rows: Iterator[Dict], header: bool):
+        writer = csv.DictWriter(f, fieldnames=first.keys())
+        if header:
+            writer.writeheader()
+        writer.writerow(first)
+        writer.writerows(rows)
+
+
+class NDJSONSink(FileSink):
+    """每行一筆 JSON (JSON Lines)，可逐筆寫入及讀取"""
+
+    EXTENSION = "ndjson"
+
+    def write_rows(self, f, first: Dict, rows: Iterator[Dict], header: bool):
+        f.write(json.dumps(first, ensure_ascii=False) + "\n")
+        f.writelines(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+
+
+class JSONSink(FileSink):
+    """{sid: row} 格式，需取得整日資料後才能寫入，大量資料請改用 NDJSONSink"""
+
+    EXTENSION = "json"
+
+    def __init__(self, path: str = None, compress: bool = False):
+        super().__init__(path, compress=compress)
+
+    def write_rows(self, f, first: Dict, rows: Iterator[Dict], header: bool):
+        rawdata = {row["sid"]: row for row in itertools.chain([first], rows)}
+        json.dump(obj=rawdata, fp=f, ensure_ascii=False, indent=4)
@@ -0,0 +1,93 @@
+import os
+from typing import Dict, List
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from ..adapter import twse
+from .base import BaseSink
+from .file import RAWDATA_PATH
+
+PARQUET_PATH = os.path.join(RAWDATA_PATH, "parquet")
+# 未列出的型別 (如 decimal.Decimal) 由 pyarrow 自行推斷
+ARROW_TYPES = {int: pa.int64(), float: pa.float64()}
+
+
+class ParquetSink(BaseSink):
+    """
+    以 Parquet 欄式儲存，依 <directory>/year=YYYY/month=MM/category=N/data.parquet 分割 (hive partitioning)
+
+    - 依 fetcher.column_types 轉為數值欄位，僅需讀取用到的欄位，例: pq.read_table(directory, columns=["close"])
+    - 同一月份的資料暫存於記憶體，換月或 close 時每個市場寫入一次
+    - 分割已存在時附加，重複的日期以新資料取代
+    """
+
+    FILENAME = "data.parquet"
+
+    def __init__(self, directory: str = PARQUET_PATH, fetcher=None, compression: str = "zstd"):
+        """
+        fetcher: 提供欄位型別及轉換 (BaseFetcher.column_types、convert)，預設為 TWSEFetcher
+        """
+        self.directory = directory
+        self.fetcher = twse.TWSEFetcher(None, True, False, False, 0) if fetcher is None else fetcher
+        self.compression = compression
+        self._month = None
+        self._rows = dict()
+        self._pending = []
+
+    @property
+    def destination(self) -> str:
+        return os.path.abspath(self.directory)
+
+    def get_path(self, month: str, category) -> str:
+        return os.path.join(
+            self.directory, f"year={month[:4]}", f"month={month[4:]}", f"category={category}", self.FILENAME
+        )
+
+    def to_table(self, rows: List[Dict]) -> pa.Table:
+        types = self.fetcher.column_types
+        names, arrays = [], []
+        for name in rows[0]:
+            if name == "category":
+                continue
+            values = [row.get(name) for row in rows]
+            cast = types.get(name)
+            if cast is None:
+                arrays += [pa.array([None if value is None else str(value) for value in values], pa.string())]
+            else:
+                values = [self.fetcher.convert(value, cast, strict=True) for value in values]
+                arrays += [pa.array(values, ARROW_TYPES.get(cast))]
+            names += [name]
+        return pa.Table.from_arrays(arrays, names=names)
+
+    def write_partition(self, month: str, category, rows: List[Dict]):
+        path = self.get_path(month, category)
+        table = self.to_table(rows)
+        if os.path.isfile(path):
+            existing = pq.ParquetFile(path).read()
+            existing = existing.filter(pc.invert(pc.is_in(existing["date"], value_set=pc.unique(table["date"]))))
+            table = pa.concat_tables([existing, table], promote_options="default")
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        pq.write_table(table, tmp, compression=self.compression)
+        os.replace(tmp, path)
+
+    def flush(self) -> List[str]:
+        for category, rows in self._rows.items():
+            self.write_partition(self._month, category, rows)
+        committed, self._pending = self._pending, []
+        self._month, self._rows = None, dict()
+        return committed
+
+    def write(self, date: str, rawdata: List[Dict]) -> List[str]:
+        committed = self.flush() if self._month not in (None, date[:6]) else []
+        self._month = date[:6]
+        for row in rawdata:
+            self._rows.setdefault(row["category"], []).append(row)
+        self._pending += [date]
+        return committed
+
+    def close(self) -> List[str]:
+        return self.flush()
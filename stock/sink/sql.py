@@ -0,0 +1,232 @@
+import csv
+import datetime
+import io
+import logging
+import sys
+from typing import Dict, List
+
+import peewee
+
+from ..orm import migrate
+from ..orm import models
+from .base import BaseSink
+
+logger = logging.getLogger(__name__)
+
+# 每個資料庫已寫入的 {sid: name}，名稱未變動者不再寫入
+_STOCK_NAMES = dict()
+# 已建立資料表 (及完成 migrate) 的資料庫，不再重複執行 DDL
+_SCHEMAS = set()
+
+
+def get_copy_value(field, value):
+    """依欄位型別轉換 (Field.db_value)，數值欄位無法轉換的值 (空字串、"OX" 等) 為 NULL，避免整批 COPY 失敗"""
+    value = field.db_value(value)
+    if isinstance(field, (peewee.IntegerField, peewee.FloatField)) and isinstance(value, str):
+        if value:
+            logger.warning("cannot convert %r to %s, set to NULL", value, field.name)
+        return None
+    return value
+
+
+def get_copy_buffer(model, columns: List[str], rows: List[Dict]) -> io.StringIO:
+    """COPY FROM STDIN (FORMAT csv) 的內容，None 輸出為空欄位即 NULL"""
+    fields = [model._meta.columns[name] for name in columns]
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([get_copy_value(field, row[field.column_name]) for field in fields] for row in rows)
+    buffer.seek(0)
+    return buffer
+
+
+class SQLSink(BaseSink):
+    # SQLite 預設每個語句最多 999 個變數，StockInfo 每筆 2 個
+    STOCK_INFO_BATCH_SIZE = 400
+    SQLITE_MAX_VARIABLE_NUMBER = 999
+    DEFAULT_BATCH_SIZE = 1000
+
+    def __init__(self, db, batch_size: int = None, days_per_transaction: int = 1, defer_index: bool = False):
+        """
+        batch_size: StockMarket 每個 INSERT 的筆數，預設 SQLite 依欄位數避開變數上限，其他資料庫 1000 筆
+        days_per_transaction: 每幾個交易日 commit 一次，同一日的資料必在同一個 transaction
+        defer_index: 大量匯入時先移除 StockMarket 的一般索引 (保留 upsert 所需的唯一索引)，close 時再一次建立
+
+        重新寫入已存在的日期時，先於同一 transaction 刪除該日的資料，重抓後已不存在的股票不會殘留
+        晚於既有最後一日的日期不需刪除，defer_index 時已存在的日期經由唯一索引刪除，皆不需掃描資料表
+        """
+        self.db = db
+        self.batch_size = batch_size
+        self.days_per_transaction = days_per_transaction
+        self.defer_index = defer_index
+        self._transaction = None
+        self._pending = []
+
+        models.StockInfo.bind(db)
+        models.StockMarket.bind(db)
+        if self.cache_key not in _SCHEMAS:
+            migrate.create_tables()
+            _SCHEMAS.add(self.cache_key)
+        self._last_date = self.get_last_date()
+        self._written = set()
+        if defer_index:
+            for index in models.StockMarket._meta.fields_to_index():
+                if not index._unique:
+                    db.execute(models.StockMarket._schema._drop_index(index, safe=True))
+
+    @property
+    def cache_key(self):
+        return (type(self.db).__name__, self.db.database, self.db.connect_params.get("host"))
+
+    @property
+    def destination(self) -> str:
+        # 連線池與否不影響寫入的資料庫
+        name, database, host = self.cache_key
+        return f"{name.replace('Pooled', '').lower()}://{host or ''}/{database}"
+
+    @property
+    def stock_names(self) -> dict:
+        if self.cache_key not in _STOCK_NAMES:
+            query = models.StockInfo.select(models.StockInfo.id, models.StockInfo.name)
+            _STOCK_NAMES[self.cache_key] = dict(query.tuples())
+        return _STOCK_NAMES[self.cache_key]
+
+    def get_last_date(self) -> str or None:
+        """既有資料的最後一日 (YYYYMMDD)"""
+        last = models.StockMarket.select(peewee.fn.MAX(models.StockMarket.date)).scalar()
+        if last is None:
+            return None
+        if isinstance(last, datetime.date):
+            return last.strftime("%Y%m%d")
+        return str(last).replace("-", "")
+
+    def delete_stock_market(self, date: str):
+        if date in self._written or (self._last_date is not None and date <= self._last_date):
+            query = models.StockMarket.delete().where(models.StockMarket.date == date)
+            if self.defer_index:
+                # 日期索引已移除，改經由 (stock_id, date) 唯一索引逐檔刪除，避免掃描整個資料表
+                query = query.where(models.StockMarket.stock.in_(models.StockInfo.select(models.StockInfo.id)))
+            query.execute()
+        self._written.add(date)
+
+    def get_batch_size(self, rows: List[Dict]):
+        if self.batch_size is not None:
+            return self.batch_size
+        if isinstance(self.db, peewee.SqliteDatabase) and rows:
+            return max(1, self.SQLITE_MAX_VARIABLE_NUMBER // len(rows[0]))
+        return self.DEFAULT_BATCH_SIZE
+
+    def upsert_stock_info(self, names: dict):
+        """僅寫入新增或更名的股票，以 INSERT ... ON CONFLICT / ON DUPLICATE KEY UPDATE 分批處理"""
+        cache = self.stock_names
+        rows = [{"id": sid, "name": name} for sid, name in names.items() if cache.get(sid) != name]
+        if not rows:
+            return
+
+        for batch in peewee.chunked(rows, self.STOCK_INFO_BATCH_SIZE):
+            models.StockInfo.insert_many(batch).on_conflict(
+                conflict_target=self.get_conflict_target(models.StockInfo.id), preserve=[models.StockInfo.name]
+            ).execute()
+        cache.update({row["id"]: row["name"] for row in rows})
+
+    def get_conflict_target(self, *fields):
+        # MySQL 不支援指定 conflict target，以 ON DUPLICATE KEY UPDATE 依唯一索引判斷
+        return None if isinstance(self.db, peewee.MySQLDatabase) else list(fields)
+
+    def upsert_stock_market(self, rows: List[Dict]):
+        """依 (stock_id, date) 唯一索引 upsert，重複寫入同一日只會更新既有資料"""
+        columns = models.StockMarket._meta.columns
+        preserve = [columns[name] for name in rows[0] if name not in ("stock_id", "date")]
+        models.StockMarket.insert_many(rows).on_conflict(
+            conflict_target=self.get_conflict_target(models.StockMarket.stock, models.StockMarket.date),
+            preserve=preserve,
+        ).execute()
+
+    def write(self, date: str, rawdata: List[Dict]) -> List[str]:
+        if self._transaction is None:
+            self._transaction = self.db.atomic()
+            self._transaction.__enter__()
+        try:
+            rows, names = [], dict()
+            for row in rawdata:
+                sid = row.pop("sid")
+                names[sid] = row.pop("name")
+                row["stock_id"] = sid
+                rows += [row]
+
+            self.upsert_stock_info(names)
+            self.delete_stock_market(date)
+            for batch in peewee.chunked(rows, self.get_batch_size(rows)):
+                self.upsert_stock_market(batch)
+        except BaseException:
+            self.rollback()
+            raise
+
+        self._pending += [date]
+        if len(self._pending) >= self.days_per_transaction:
+            return self.commit()
+        return []
+
+    def commit(self) -> List[str]:
+        if self._transaction is not None:
+            self._transaction.__exit__(None, None, None)
+            self._transaction = None
+        committed, self._pending = self._pending, []
+        return committed
+
+    def rollback(self):
+        if self._transaction is not None:
+            self._transaction.__exit__(*sys.exc_info())
+            self._transaction = None
+        self._pending = []
+        # 已回復的名稱可能未寫入，下次重新讀取
+        _STOCK_NAMES.pop(self.cache_key, None)
+
+    def close(self) -> List[str]:
+        committed = self.commit()
+        if self.defer_index:
+            models.StockMarket._schema.create_indexes(safe=True)
+            self.defer_index = False
+        return committed
+
+
+class PostgreSQLSink(SQLSink):
+    """
+    PostgreSQL 專用，StockMarket 以 COPY FROM STDIN 寫入暫存表後一次合併 (INSERT ... SELECT ... ON CONFLICT)
+
+    - 不受 INSERT 參數數量限制，預設每日一次 COPY
+    - 暫存表為 TEMPORARY，僅存在於目前連線，合併後清空
+    """
+
+    STAGING_TABLE = "stockmarket_staging"
+
+    def get_batch_size(self, rows: List[Dict]):
+        if self.batch_size is not None:
+            return self.batch_size
+        return max(1, len(rows))
+
+    def create_staging_table(self):
+        # CREATE TABLE AS 不複製 NOT NULL 限制，id 可留空
+        self.db.execute_sql(
+            f'CREATE TEMPORARY TABLE IF NOT EXISTS "{self.STAGING_TABLE}" '
+            f'AS SELECT * FROM "{models.StockMarket._meta.table_name}" WITH NO DATA'
+        )
+
+    def copy(self, table: str, columns: List[str], rows: List[Dict]):
+        """以 CSV 格式串流寫入 (見 get_copy_buffer)"""
+        buffer = get_copy_buffer(models.StockMarket, columns, rows)
+        names = ", ".join(f'"{name}"' for name in columns)
+        self.db.cursor().copy_expert(f'COPY "{table}" ({names}) FROM STDIN WITH (FORMAT csv)', buffer)
+
+    def upsert_stock_market(self, rows: List[Dict]):
+        columns = list(rows[0])
+        self.create_staging_table()
+        self.copy(self.STAGING_TABLE, columns, rows)
+
+        staging = peewee.Table(self.STAGING_TABLE)
+        fields = [models.StockMarket._meta.columns[name] for name in columns]
+        preserve = [field for field in fields if field.column_name not in ("stock_id", "date")]
+        models.StockMarket.insert_from(
+            staging.select(*[getattr(staging.c, name) for name in columns]), fields
+        ).on_conflict(
+            conflict_target=[models.StockMarket.stock, models.StockMarket.date], preserve=preserve
+        ).returning().execute()
+        self.db.execute_sql(f'TRUNCATE "{self.STAGING_TABLE}"')
@@ -1,9 +1,32 @@
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+import threading
+
 import pytest
 
 from src.adapter import base
+from src.box import retry
+from src.box.exceptions import ThrottledError
 from src.proxy import provider
 
 
+class ThrottleHandler(BaseHTTPRequestHandler):
+    """對任何請求回應 429"""
+
+    protocol_version = "HTTP/1.1"
+    requests = 0
+
+    def do_GET(self):
+        ThrottleHandler.requests += 1
+        self.send_response(429)
+        self.send_header("Retry-After", "7")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
 @pytest.mark.run(order=2)
 class TestBaseFetcher:
     def setup(self):
@@ -64,6 +87,79 @@ class TestBaseFetcher:
             "note",
         ]
 
+    def test_session(self):
+        assert self.obj._session is None
+        assert self.obj.session is self.obj.session
+        adapter = self.obj.session.get_adapter("http://www.twse.com.tw/")
+        # 僅由 RetryPolicy 重試，429/5xx 須回傳至 raise_for_throttle
+        assert adapter.max_retries.total == 0
+        assert not adapter.max_retries.status_forcelist
+        assert self.obj._timeout == (5, 30)
+
+    def test_get_throttled(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), ThrottleHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            # session 不重試，429 及 Retry-After 交由 RetryPolicy 處理
+            with pytest.raises(ThrottledError) as e:
+                self.obj.get(f"http://127.0.0.1:{server.server_port}/", {})
+            assert e.value.retry_after == 7
+            assert ThrottleHandler.requests == 1
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_get_bucket(self):
+        url = "https://www.twse.com.tw/exchangeReport/MI_INDEX"
+        proxies = [{"http": "http://10.0.0.1:80"}, {"http": "http://10.0.0.2:80"}]
+        assert self.obj.get_bucket(url) is self.obj.get_bucket(url, {})
+        # 每個 proxy 各自一份額度
+        assert self.obj.get_bucket(url, proxies[0]) is self.obj.get_bucket(url, dict(proxies[0]))
+        assert self.obj.get_bucket(url, proxies[0]) is not self.obj.get_bucket(url, proxies[1])
+        assert self.obj.get_bucket(url, proxies[0]) is not self.obj.get_bucket(url)
+
+    def test_request_retry(self):
+        self.obj._retry_policy = retry.RetryPolicy(backoff_factor=0)
+        gets = []
+        self.obj.get = lambda url, params: gets.append(url) or len(gets)
+
+        def parse(date, resp):
+            if resp == 1:
+                raise ConnectionError("get data is empty, need to redownload.")
+            return {"2330": ["2330"]}
+
+        # 只重新下載失敗的資料來源
+        assert self.obj.request("20200102", base.Route("http://test/MI_MARGN", {}, parse)) == {"2330": ["2330"]}
+        assert gets == ["http://test/MI_MARGN"] * 2
+
+    def test_fetch_datasets(self):
+        self.obj.adapter_fetch_price = lambda date: {"2330": ["2330"]}
+        self.obj.adapter_fetch_institutional_investors = lambda date: None
+        self.obj.adapter_fetch_credit_transactions_securities = lambda date: {"2330": ["0"]}
+
+        sequential = self.obj.fetch_datasets("20200102")
+        self.obj._concurrent = True
+        assert self.obj.fetch_datasets("20200102") == sequential == [{"2330": ["2330"]}, None, {"2330": ["0"]}]
+
+    def test_typed(self):
+        assert self.obj.add("1", "2") == "3"
+        self.obj._typed = True
+        assert self.obj.add("1", "2") == 3
+
+        price = {"2330": ["2330", "台積電", "300.00", "310.00", None, "305.00", "1000", "10", "100000"]}
+        credit = {"2330": ["1", "2", "3", "4", "5", "6", "7", "8", "9", "10", "", "X"]}
+        data = self.obj.combine("20200102", 1, price, {"2330": [3] + ["-5"] * 9}, credit)[0]
+        assert (data["sid"], data["open"], data["low"], data["capacity"]) == ("2330", 300.0, None, 1000)
+        assert (data["foreign_dealers_buy"], data["dealer_total"]) == (3, -5)
+        assert (data["offsetting_margin_short"], data["note"]) == (None, "X")
+
+    def test_convert(self, caplog):
+        assert self.obj.convert("1000", int) == 1000
+        assert [self.obj.convert(value, int) for value in ["", "--", "X", None]] == [None] * 4
+        # 無法辨識的文字不可默默轉為 None
+        assert self.obj.convert("OX", int) == "OX"
+        assert "OX" in caplog.text
+
     def test_clean(self):
         assert self.obj.clean("-") == "-"
         assert self.obj.clean("--") is None
@@ -72,5 +168,44 @@ class TestBaseFetcher:
         assert self.obj.clean("1,000") == "1000"
         assert self.obj.clean("1,000,000") == "1000000"
 
+    def test_clean_rows(self):
+        rows = [
+            ["2330", "台積電", "1,000", "--", "+ 1.50", "- 0.30", " 94.90\xa0", "⊕12", "-, 5", ""],
+            ["6488", "-"],
+            [],
+        ]
+        assert self.obj.clean_rows(rows) == [[self.obj.clean(v) for v in row] for row in rows]
+        assert self.obj.clean_rows([["1,000", 5, None]]) == [["1000", 5, None]]
+        assert self.obj.clean_rows([["1,000\x00", "--"]]) == [["1000\x00", None]]
+
     def test_combine(self):
-        return NotImplemented
+        price = {
+            "2330": ["2330", "台積電", "1", "2", "3", "4", "5", "6", "7"],
+            "2454": ["2454", "聯發科", "1", "2", "3", "4", "5", "6", "7"],
+        }
+        institutional_investors = {"2330": [str(i) for i in range(10)]}
+
+        data = self.obj.combine("20200102", 1, price, None, None)
+        assert data[1] == dict(zip(self.obj.base_columns + self.obj.price_columns, ["20200102", 1] + price["2454"]))
+
+        data = self.obj.combine("20200102", 1, price, institutional_investors, {})
+        assert len(data[0]) == 2 + 9 + 10 + 12
+        assert data[0]["institutional_investors_total"] == "9"
+        assert data[1]["foreign_dealers_buy"] == data[1]["note"] == "0"
+
+    def test_combine_columns(self):
+        price = {"2330": ["2330", "台積電", "1", "2", "3", "4", "5", "6", "7"]}
+        columns = self.obj.combine_columns("20200102", 1, price, {}, None)
+        assert columns["close"] == ["4"]
+        assert columns["dealer_total"] == ["0"]
+        assert list(columns) == self.obj.combine("20200102", 1, price, {}, None)
+        assert self.obj.get_schema(True, False) is self.obj.get_schema(True, False)
+
+    def test_combine_missing_dataset(self):
+        price = {"2330": ["2330", "台積電", "1", "2", "3", "4", "5", "6", "7"]}
+        credit = {"2330": [str(200 + i) for i in range(11)] + ["OX"]}
+        # 缺少三大法人資料時，融資融券不可移至三大法人的欄位
+        data = self.obj.combine("20200102", 1, price, {}, credit)
+        assert list(self.obj.combine_columns("20200102", 1, price, {}, credit)) == data
+        assert (data[0]["foreign_dealers_buy"], data[0]["institutional_investors_total"]) == ("0", "0")
+        assert (data[0]["margin_purchase"], data[0]["margin_sales"], data[0]["note"]) == ("200", "201", "OX")
@@ -0,0 +1,50 @@
+import datetime
+
+import pytest
+
+from src.adapter import base
+from src.adapter.cache import ResponseCache
+from src.proxy import provider
+
+URL = "http://www.twse.com.tw/exchangeReport/MI_INDEX"
+
+
+@pytest.mark.run(order=2)
+class TestResponseCache:
+    def setup(self):
+        self.resp = base.RawResponse(url=URL, status_code=200, content="台積電".encode("big5"), encoding="big5")
+
+    def test_get_set(self, tmp_path):
+        cache = ResponseCache(directory=str(tmp_path))
+        params = {"date": "20200102", "response": "json"}
+        assert cache.get(URL, params, "20200102") is None
+
+        cache.set(URL, params, "20200102", self.resp)
+        resp = cache.get(URL, {"response": "json", "date": "20200102"}, "20200102")
+        assert (resp.url, resp.status_code, resp.text) == (URL, 200, "台積電")
+
+    def test_today_expired(self, tmp_path):
+        cache = ResponseCache(directory=str(tmp_path), ttl=-1)
+        today = datetime.datetime.now().strftime("%Y%m%d")
+        cache.set(URL, {}, today, self.resp)
+        assert cache.get(URL, {}, today) is None
+
+        cache.set(URL, {}, "20200102", self.resp)
+        assert cache.get(URL, {}, "20200102") is not None
+
+    def test_fetcher_request(self, tmp_path):
+        fetcher = base.BaseFetcher(
+            proxy_provider=provider.NoProxyProvier(),
+            enable_fetch_price=True,
+            enable_fetch_institutional_investors=False,
+            enable_fetch_credit_transactions_securities=False,
+            sleep_second=0,
+            cache=ResponseCache(directory=str(tmp_path)),
+        )
+        route = base.Route(url=URL, params={}, parse=lambda date, resp: resp.text)
+        fetcher.get = lambda url, params: self.resp
+        assert fetcher.request("20200102", route) == "台積電"
+
+        # 已快取，不再下載
+        fetcher.get = None
+        assert fetcher.request("20200102", route) == "台積電"
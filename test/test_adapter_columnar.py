@@ -0,0 +1,16 @@
+import pytest
+
+from src.adapter.columnar import ColumnarResult
+
+
+@pytest.mark.run(order=2)
+def test_columnar_result():
+    twse = ColumnarResult({"sid": ["2330", "2454"], "close": ["1", "2"]})
+    tpex = ColumnarResult({"sid": ["5483"], "close": ["3"]})
+
+    result = ColumnarResult.concat([twse, ColumnarResult({}), tpex])
+    assert len(result) == 3
+    assert result["close"] == ["1", "2", "3"]
+    assert result[2] == {"sid": "5483", "close": "3"}
+    assert result == [{"sid": "2330", "close": "1"}, {"sid": "2454", "close": "2"}, {"sid": "5483", "close": "3"}]
+    assert not ColumnarResult.concat([])
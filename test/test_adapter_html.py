@@ -0,0 +1,29 @@
+import pytest
+
+from src.adapter import html
+
+TEXT = """
+<html><body>
+<div id="contentArea">
+<table>
+<tr><th>代號</th><th>名稱</th><th>收盤</th></tr>
+<tr><td>5483</td><td><a href="#">中美晶</a></td><td> 94.90&nbsp;</td></tr>
+<tr><td>6488</td><td>環球晶</td><td><span>1,</span>000.00</td></tr>
+<tr><td>0000</td><td><table><tr><td>巢狀</td></tr></table></td><td>--</td></tr>
+</table>
+</div>
+<table><tbody></tbody></table>
+</body></html>
+"""
+
+
+@pytest.mark.run(order=2)
+def test_find_rows_same_as_bs4():
+    rows = html.find_rows(TEXT, "div", id="contentArea", parser="lxml")
+    assert rows == html.find_rows(TEXT, "div", id="contentArea", parser="bs4")
+    assert rows[1] == ["5483", "中美晶", " 94.90\xa0"]
+    assert rows[2] == ["6488", "環球晶", "1,000.00"]
+
+    assert html.find_rows(TEXT, "tbody") == html.find_rows(TEXT, "tbody", parser="bs4") == []
+    assert html.find_rows(TEXT, "div", id="missing") is None
+    assert html.find_rows("", "tbody") is None
@@ -0,0 +1,115 @@
+import asyncio
+import datetime
+import threading
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from src import aioclient  # noqa: E402
+from src.adapter.base import Route  # noqa: E402
+from src.sink import file  # noqa: E402
+
+
+@pytest.mark.run(order=4)
+class TestAsyncStockClient:
+    def setup(self):
+        self.obj = aioclient.AsyncTaiwanStockClient(backoff_factor=0)
+
+    def test_request_retry(self):
+        responses = [ConnectionError("empty"), "resp"]
+
+        async def get(fetcher, url, params):
+            response = responses.pop(0)
+            if isinstance(response, Exception):
+                raise response
+            return response
+
+        self.obj.get = get
+        route = Route(url="http://www.twse.com.tw/", params={}, parse=lambda date, resp: (date, resp))
+        assert asyncio.run(self.obj.request(self.obj.twse, "20200102", route)) == ("20200102", "resp")
+        assert asyncio.run(self.obj.request(self.obj.twse, "20200102", None)) is None
+
+    def test_fetch_range(self, tmp_path):
+        async def fetch(year, month, day):
+            return [{"date": f"{year}{month:0>2}{day:0>2}", "sid": "2330"}]
+
+        self.obj.fetch = fetch
+        kwargs = {
+            "start": datetime.date(2020, 1, 3),
+            "end": datetime.date(2020, 1, 6),
+            "sink": file.JSONSink(str(tmp_path / "{date}.json")),
+            "checkpoint": str(tmp_path / "checkpoint.json"),
+            "holidays": set(),
+        }
+        assert asyncio.run(self.obj.fetch_range(**kwargs)) == ["20200103", "20200106"]
+        assert asyncio.run(self.obj.fetch_range(**kwargs)) == []
+
+    def test_request_executor(self):
+        threads = []
+
+        def parse(date, resp):
+            threads.append(threading.get_ident())
+            return resp
+
+        async def get(fetcher, url, params):
+            return "resp"
+
+        self.obj.get = get
+        route = Route(url="http://www.twse.com.tw/", params={}, parse=parse)
+        assert asyncio.run(self.obj.request(self.obj.twse, "20200102", route)) == "resp"
+        # 解析不在 event loop 的執行緒
+        assert threads and threads[0] != threading.get_ident()
+
+    def test_fetch_range_cancel(self, tmp_path):
+        cancelled = []
+
+        async def fetch(year, month, day):
+            if day == 1:
+                raise ConnectionError("failed")
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(day)
+                raise
+
+        self.obj.fetch = fetch
+        kwargs = {
+            "start": datetime.date(2020, 1, 1),
+            "end": datetime.date(2020, 1, 3),
+            "sink": file.JSONSink(str(tmp_path / "{date}.json")),
+            "checkpoint": str(tmp_path / "checkpoint.json"),
+            "holidays": set(),
+        }
+        with pytest.raises(ConnectionError):
+            asyncio.run(self.obj.fetch_range(**kwargs))
+        # 其餘交易日不再繼續抓取
+        assert sorted(cancelled) == [2, 3]
+
+    def test_fetch_range_order(self, tmp_path):
+        async def fetch(year, month, day):
+            # 較早的交易日較晚完成
+            await asyncio.sleep((10 - day) * 0.01)
+            return [{"date": f"{year}{month:0>2}{day:0>2}", "sid": "2330"}]
+
+        class Sink(file.JSONSink):
+            def write(self, date, rawdata):
+                written.append(date)
+                return [date]
+
+        written = []
+        self.obj.fetch = fetch
+        kwargs = {
+            "start": datetime.date(2020, 1, 1),
+            "end": datetime.date(2020, 1, 9),
+            "sink": Sink(str(tmp_path / "{date}.json")),
+            "checkpoint": str(tmp_path / "checkpoint.json"),
+            "holidays": set(),
+            "concurrency": 2,
+        }
+        asyncio.run(self.obj.fetch_range(**kwargs))
+        assert (
+            written
+            == sorted(written)
+            == ["20200101", "20200102", "20200103", "20200106", "20200107", "20200108", "20200109"]
+        )
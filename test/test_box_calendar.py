@@ -0,0 +1,32 @@
+import datetime
+import json
+
+import pytest
+
+from src.box import calendar
+
+
+@pytest.mark.run(order=1)
+def test_load_holidays(tmp_path):
+    path = tmp_path / "holidays.json"
+    assert calendar.load_holidays(str(path)) == set()
+
+    path.write_text(
+        json.dumps(
+            {
+                "update": "",
+                "total": [
+                    {"date": "20200123", "name": "農曆春節前最後交易日", "description": ""},
+                    {"date": "20200124", "name": "農曆春節", "description": ""},
+                ],
+            }
+        ),
+        encoding="utf8",
+    )
+    assert calendar.load_holidays(str(path)) == {"20200124"}
+
+
+@pytest.mark.run(order=1)
+def test_trading_days():
+    days = calendar.trading_days(datetime.date(2020, 1, 20), datetime.date(2020, 1, 27), holidays={"20200124"})
+    assert [d.strftime("%Y%m%d") for d in days] == ["20200120", "20200121", "20200122", "20200123", "20200127"]
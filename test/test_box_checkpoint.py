@@ -0,0 +1,13 @@
+import pytest
+
+from src.box.checkpoint import Checkpoint
+
+
+@pytest.mark.run(order=1)
+def test_checkpoint_resume(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    checkpoint = Checkpoint(path)
+    assert "20200102" not in checkpoint
+
+    checkpoint.mark("20200102")
+    assert "20200102" in Checkpoint(path)
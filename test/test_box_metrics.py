@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+from src.box import metrics
+
+
+@pytest.mark.run(order=1)
+class TestMetrics:
+    def setup(self):
+        self.obj = metrics.Metrics()
+
+    def test_get_endpoint(self):
+        url = "https://www.twse.com.tw/exchangeReport/MI_INDEX?response=json"
+        assert metrics.get_endpoint(url) == "www.twse.com.tw/exchangeReport/MI_INDEX"
+
+    def test_observe(self):
+        self.obj.observe("parse", 0.5, endpoint="a")
+        self.obj.observe("parse", 1.5, endpoint="a")
+        self.obj.observe("parse", 1.0, endpoint="b")
+        timings = self.obj.to_dict()["timings"]
+        assert timings[0] == {"name": "parse", "labels": {"endpoint": "a"}, "count": 2, "sum": 2.0, "max": 1.5}
+        assert timings[1]["labels"] == {"endpoint": "b"}
+
+    def test_increment(self):
+        self.obj.increment("responses", endpoint="a", status=200)
+        self.obj.increment("responses", endpoint="a", status=200)
+        self.obj.increment("response_bytes", 100, endpoint="a")
+        counters = {counter["name"]: counter for counter in self.obj.to_dict()["counters"]}
+        assert counters["responses"] == {"name": "responses", "labels": {"endpoint": "a", "status": "200"}, "value": 2}
+        assert counters["response_bytes"]["value"] == 100
+
+    def test_labels(self):
+        with self.obj.labels(date="20200102"):
+            with self.obj.timer("clean"):
+                pass
+            with self.obj.labels(endpoint="a"):
+                self.obj.increment("retries")
+        self.obj.increment("retries")
+        assert self.obj.to_dict()["timings"][0]["labels"] == {"date": "20200102"}
+        assert [counter["labels"] for counter in self.obj.to_dict()["counters"]] == [
+            {},
+            {"date": "20200102", "endpoint": "a"},
+        ]
+
+    def test_hook(self):
+        events = []
+        hook = lambda *args: events.append(args)  # noqa: E731
+        self.obj.add_hook(hook)
+        self.obj.increment("cache_hits", endpoint="a")
+        self.obj.remove_hook(hook)
+        self.obj.increment("cache_hits", endpoint="a")
+        assert events == [("counter", "cache_hits", 1, {"endpoint": "a"})]
+
+    def test_export(self):
+        self.obj.observe("request", 0.25, endpoint="a")
+        self.obj.increment("responses", endpoint='"a"', status=200)
+        assert self.obj.to_prometheus().splitlines() == [
+            "# TYPE stock_request_seconds summary",
+            'stock_request_seconds_count{endpoint="a"} 1',
+            'stock_request_seconds_sum{endpoint="a"} 0.250000',
+            "# TYPE stock_request_seconds_max gauge",
+            'stock_request_seconds_max{endpoint="a"} 0.250000',
+            "# TYPE stock_responses_total counter",
+            'stock_responses_total{endpoint="\\"a\\"",status="200"} 1',
+        ]
+        assert json.loads(self.obj.to_json()) == self.obj.to_dict()
+
+        self.obj.reset()
+        assert self.obj.to_dict() == {"timings": [], "counters": []}
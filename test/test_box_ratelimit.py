@@ -0,0 +1,24 @@
+import time
+
+import pytest
+
+from src.box import ratelimit
+
+
+@pytest.mark.run(order=1)
+def test_token_bucket_burst():
+    bucket = ratelimit.TokenBucket(capacity=3, period=0.2)
+    assert [bucket.acquire() for _ in range(3)] == [0, 0, 0]
+
+    start = time.monotonic()
+    assert bucket.acquire() > 0
+    assert time.monotonic() - start >= 0.19
+
+
+@pytest.mark.run(order=1)
+def test_get_bucket_shared():
+    assert ratelimit.get_bucket("test.host", 3, 5) is ratelimit.get_bucket("test.host", 3, 5)
+    assert ratelimit.get_bucket("test.host", 3, 5) is not ratelimit.get_bucket("other.host", 3, 5)
+    # 設定不同時不沿用先建立的 TokenBucket
+    bucket = ratelimit.get_bucket("test.host", 1, 2)
+    assert (bucket.capacity, bucket.period) == (1, 2)
@@ -0,0 +1,85 @@
+import asyncio
+import datetime
+import email.utils
+
+import pytest
+
+from src.box import retry
+from src.box.exceptions import ThrottledError
+
+
+@pytest.mark.run(order=1)
+class TestRetryPolicy:
+    def test_get_delay(self):
+        policy = retry.RetryPolicy(backoff_factor=1, max_backoff=5, jitter=False)
+        assert [policy.get_delay(i) for i in range(4)] == [1, 2, 4, 5]
+        assert policy.get_delay(0, retry_after=10) == 10
+
+        policy = retry.RetryPolicy(backoff_factor=1, max_backoff=5)
+        assert all(0 <= policy.get_delay(3) <= 5 for _ in range(20))
+
+    def test_call(self, monkeypatch):
+        sleeps = []
+        monkeypatch.setattr(retry.time, "sleep", sleeps.append)
+        calls = []
+
+        def flaky():
+            calls.append(1)
+            if len(calls) == 1:
+                raise ThrottledError("http://test/", 429, retry_after=7)
+            if len(calls) == 2:
+                raise ConnectionError("get data is empty, need to redownload.")
+            return "ok"
+
+        policy = retry.RetryPolicy(backoff_factor=0.1, jitter=False)
+        assert policy.call(flaky) == "ok"
+        assert sleeps == [7, 0.2]
+
+        def broken():
+            calls.append(1)
+            raise ConnectionError
+
+        calls.clear()
+        with pytest.raises(ConnectionError):
+            retry.RetryPolicy(max_retries=1, backoff_factor=0).call(broken)
+        assert len(calls) == 2
+        with pytest.raises(ValueError):
+            policy.call(int, "X")
+
+    def test_call_async(self, monkeypatch):
+        sleeps = []
+
+        async def sleep(delay):
+            sleeps.append(delay)
+
+        monkeypatch.setattr(retry.asyncio, "sleep", sleep)
+        errors = [ThrottledError("http://test/", 429, retry_after=7), ConnectionError("empty")]
+
+        async def flaky(value):
+            if errors:
+                raise errors.pop(0)
+            return value
+
+        policy = retry.RetryPolicy(backoff_factor=0.1, jitter=False)
+        assert asyncio.run(policy.call_async(flaky, "ok", endpoint="test")) == "ok"
+        assert sleeps == [7, 0.2]
+
+    def test_parse_retry_after(self):
+        assert retry.parse_retry_after("120") == 120
+        assert retry.parse_retry_after(None) is None
+        assert retry.parse_retry_after("soon") is None
+        when = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=60)
+        assert 55 < retry.parse_retry_after(email.utils.format_datetime(when)) <= 60
+
+    def test_raise_for_throttle(self):
+        retry.raise_for_throttle("http://test/", 200, {})
+        with pytest.raises(ThrottledError) as e:
+            retry.raise_for_throttle("http://test/", 503, {"Retry-After": "3"})
+        assert e.value.retry_after == 3
+
+    def test_raise_for_status(self):
+        retry.raise_for_status("http://test/", 200, {})
+        with pytest.raises(ThrottledError):
+            retry.raise_for_status("http://test/", 429, {})
+        with pytest.raises(ConnectionError):
+            retry.raise_for_status("http://test/", 502, {})
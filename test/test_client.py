@@ -1,10 +1,14 @@
+import datetime
 import json
 import os
 import time
 
+from playhouse.pool import PooledMySQLDatabase
 import pytest
 
 from src import client
+from src.box.metrics import METRICS
+from src.sink import file
 
 
 @pytest.mark.run(order=4)
@@ -57,5 +61,98 @@ class TestStockClient:
                     testdata = json.load(f)
                 self.__assert(rawdata, testdata)
 
+    def test_fetch_range(self, tmp_path):
+        object = client.TaiwanStockClient()
+        fetched = []
+
+        def fetch(year, month, day):
+            fetched.append((year, month, day))
+            return [{"date": f"{year}{month:0>2}{day:0>2}", "sid": "2330"}]
+
+        object.fetch = fetch
+        kwargs = {
+            "start": datetime.date(2020, 1, 3),
+            "end": datetime.date(2020, 1, 6),
+            "sink": file.JSONSink(str(tmp_path / "{date}.json")),
+            "checkpoint": str(tmp_path / "checkpoint.json"),
+            "holidays": set(),
+        }
+        assert object.fetch_range(**kwargs) == ["20200103", "20200106"]
+        assert fetched == [(2020, 1, 3), (2020, 1, 6)]
+        assert (tmp_path / "20200106.json").is_file()
+
+        # 已完成的日期不再重新抓取
+        assert object.fetch_range(**kwargs) == []
+        assert len(fetched) == 2
+
+    def test_default_checkpoint(self, tmp_path):
+        def path(sink, *datasets):
+            return client.get_checkpoint(sink, datasets=("price",) + datasets).path
+
+        sink = file.CSVSink(str(tmp_path / "a" / "{date}.csv"))
+        assert path(sink) == path(file.CSVSink(str(tmp_path / "a" / "{date}.csv")))
+        # 不同的目的地或資料種類使用不同的 checkpoint
+        assert path(sink) != path(file.CSVSink(str(tmp_path / "b" / "{date}.csv")))
+        assert path(sink) != path(sink, "institutional_investors")
+        assert os.path.basename(path(sink)).startswith(".csvsink.")
+        assert client.get_datasets(client.TaiwanStockClient().twse) == ("price",)
+
+    def test_iter_fetch(self, monkeypatch):
+        object = client.TaiwanStockClient()
+        calls = []
+
+        def fetch(fetcher, year, month, day):
+            calls.append(type(fetcher).__name__)
+            return [{"sid": type(fetcher).__name__}]
+
+        monkeypatch.setattr(type(object.twse), "fetch", fetch)
+        monkeypatch.setattr(type(object.tpex), "fetch", fetch)
+
+        rows = object.iter_fetch(2020, 1, 2)
+        # TWSE 的資料產生時尚未抓取 TPEX
+        assert next(rows) == {"sid": "TWSEFetcher"}
+        assert calls == ["TWSEFetcher"]
+        assert list(rows) == [{"sid": "TPEXFetcher"}]
+
+    def test_fetch_to_sqlite(self, monkeypatch, tmp_path):
+        def fetch(self, year, month, day):
+            return [{"date": "20200102", "category": 1, "sid": "2330", "name": "台積電", "close": "300.00"}]
+
+        monkeypatch.setattr(client.TaiwanStockClient, "fetch", fetch)
+        METRICS.reset()
+        client.TaiwanStockClient().fetch_to_sqlite(2020, 1, 2, database_name=str(tmp_path / "stock.db"))
+
+        # 單日寫入同樣記錄 sink_write 時間
+        labels = [timing["labels"] for timing in METRICS.to_dict()["timings"] if timing["name"] == "sink_write"]
+        assert labels == [{"sink": "SQLSink", "date": "20200102"}]
+
+    def test_get_mysql(self, monkeypatch):
+        statements = []
+
+        class Connection:
+            def cursor(self):
+                return self
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                pass
+
+            def execute(self, sql):
+                statements.append(sql)
+
+            def close(self):
+                pass
+
+        monkeypatch.setattr(client.pymysql, "connect", lambda **kwargs: Connection())
+        object = client.TaiwanStockClient()
+        db = object.get_mysql("stock", "localhost", "root", "password")
+
+        # 同一資料庫共用連線池，不再執行 CREATE DATABASE
+        assert object.get_mysql("stock", "localhost", "root", "password") is db
+        assert len(statements) == 1
+        assert isinstance(db, PooledMySQLDatabase)
+
     # def test_fetch_sql(self):
     # NotImplementedError
@@ -0,0 +1,38 @@
+import peewee
+import pytest
+
+from src.orm import migrate
+from src.orm import models
+
+
+@pytest.mark.run(order=2)
+class TestMigrate:
+    def setup(self):
+        self.db = peewee.SqliteDatabase(":memory:")
+        models.StockInfo.bind(self.db)
+        models.StockMarket.bind(self.db)
+
+    def test_create_tables(self):
+        # 舊版資料庫：沒有唯一索引且已有重複資料
+        models.StockInfo.create_table()
+        models.StockMarket.create_table()
+        self.db.execute_sql("DROP INDEX stockmarket_stock_id_date")
+        models.StockInfo.create(id="2330", name="台積電")
+        for close in [300, 301, 302]:
+            models.StockMarket.create(date="20200102", category=1, stock="2330", close=close)
+        models.StockMarket.create(date="20200103", category=1, stock="2330", close=303)
+
+        migrate.create_tables()
+        assert "stockmarket_stock_id_date" in migrate.get_index_names(models.StockMarket)
+        assert [row.close for row in models.StockMarket.select().order_by(models.StockMarket.date)] == [302, 303]
+
+        # 再次執行不會變動
+        migrate.create_tables()
+        assert models.StockMarket.select().count() == 2
+
+    def test_unique(self):
+        migrate.create_tables()
+        models.StockInfo.create(id="2330", name="台積電")
+        models.StockMarket.create(date="20200102", category=1, stock="2330")
+        with pytest.raises(peewee.IntegrityError):
+            models.StockMarket.create(date="20200102", category=1, stock="2330")
@@ -0,0 +1,63 @@
+import datetime
+import json
+import shutil
+import tempfile
+
+import pytest
+
+from src import client
+from src import pipeline
+from src.adapter.base import RawResponse
+from src.adapter.cache import ResponseCache
+from src.adapter.columnar import ColumnarResult
+
+MI_INDEX = {
+    "stat": "OK",
+    "fields9": ["證券代號", "證券名稱", "成交股數", "成交筆數", "成交金額", "開盤價", "最高價", "最低價", "收盤價"],
+    "data9": [["2330", "台積電", "1,000", "10", "100,000", "300.00", "310.00", "299.00", "305.00"]],
+}
+
+
+@pytest.mark.run(order=4)
+class TestParsePipeline:
+    def setup(self):
+        # 預先寫入 cache，不需連線
+        self.directory = tempfile.mkdtemp()
+        self.cache = ResponseCache(directory=self.directory)
+        route = client.TaiwanStockClient().twse.route_price("20200102")
+        content = json.dumps(MI_INDEX, ensure_ascii=False).encode("utf8")
+        self.cache.set(route.url, route.params, "20200102", RawResponse(route.url, 200, content))
+
+    def teardown(self):
+        shutil.rmtree(self.directory)
+
+    def test_run(self):
+        object = client.TaiwanStockClient(cache=self.cache)
+        obj = pipeline.ParsePipeline(object, processes=1)
+        obj.fetchers = [object.twse]
+        [(date, rawdata)] = list(obj.run([datetime.date(2020, 1, 2)]))
+        assert date == datetime.date(2020, 1, 2)
+        assert rawdata == [
+            {
+                "date": "20200102",
+                "category": 1,
+                "sid": "2330",
+                "name": "台積電",
+                "open": "300.00",
+                "high": "310.00",
+                "low": "299.00",
+                "close": "305.00",
+                "capacity": "1000",
+                "transaction": "10",
+                "turnover": "100000",
+            }
+        ]
+
+    def test_run_columnar(self):
+        object = client.TaiwanStockClient(cache=self.cache, columnar=True)
+        obj = pipeline.ParsePipeline(object, processes=1)
+        obj.fetchers = [object.twse]
+        [(date, rawdata)] = list(obj.run([datetime.date(2020, 1, 2)]))
+        # 與 TaiwanStockClient.fetch 相同回傳 ColumnarResult
+        assert isinstance(rawdata, ColumnarResult)
+        assert rawdata.to_list()[0]["close"] == "305.00"
@@ -0,0 +1,41 @@
+import pytest
+
+from src.proxy import provider
+
+
+@pytest.mark.run(order=1)
+class TestHealthAwareProxiesProvider:
+    def setup(self):
+        self.proxies = [{"http": f"http://10.0.0.{i}:80", "https": f"http://10.0.0.{i}:80"} for i in range(3)]
+        self.obj = provider.HealthAwareProxiesProvider(self.proxies, top=2, base_quarantine=60)
+
+    def test_fastest(self):
+        for proxy, latency in zip(self.proxies, [0.5, 0.1, 0.3]):
+            self.obj.report(proxy, latency=latency, status_code=200)
+
+        # 延遲最低的兩個輪流使用
+        assert {str(self.obj.get_proxy()) for _ in range(4)} == {str(self.proxies[1]), str(self.proxies[2])}
+
+    def test_quarantine(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(provider.time, "monotonic", lambda: now[0])
+        for proxy in self.proxies:
+            self.obj.report(proxy, latency=0.1, status_code=200)
+
+        self.obj.report(self.proxies[0], status_code=429)
+        self.obj.report(self.proxies[1], error=ConnectionError())
+        self.obj.report(self.proxies[1], error=ConnectionError())
+        assert self.obj.health[self.obj.get_key(self.proxies[1])].quarantined_until == 1120.0
+        assert {str(self.obj.get_proxy()) for _ in range(4)} == {str(self.proxies[2])}
+
+        # 隔離期滿恢復，成功後清除失敗次數
+        now[0] = 1061.0
+        assert str(self.proxies[0]) in {str(self.obj.get_proxy()) for _ in range(4)}
+        self.obj.report(self.proxies[0], latency=0.1, status_code=200)
+        assert self.obj.health[self.obj.get_key(self.proxies[0])].failures == 0
+
+    def test_all_quarantined(self):
+        for i, proxy in enumerate(self.proxies):
+            for _ in range(3 - i):
+                self.obj.report(proxy, status_code=403)
+        assert self.obj.get_proxy() == self.proxies[2]
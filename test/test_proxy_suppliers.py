@@ -0,0 +1,51 @@
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+import json
+import threading
+
+import pytest
+
+from src.proxy import suppliers
+
+
+class ProxyHandler(BaseHTTPRequestHandler):
+    """代替 proxy 及驗證目標，對任何請求回應 200"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.mark.run(order=1)
+class TestFreeProxy:
+    def setup(self):
+        self.servers = [ThreadingHTTPServer(("127.0.0.1", 0), ProxyHandler) for _ in range(2)]
+        for server in self.servers:
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def teardown(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+
+    def test_validate(self, tmp_path):
+        path = str(tmp_path / "_setting.json")
+        obj = suppliers.FreeProxy(timeout=2, check_url="http://check.invalid/", max_workers=4, path=path)
+        addresses = [f"127.0.0.1:{server.server_address[1]}" for server in self.servers] + ["127.0.0.1:1"]
+
+        proxies = obj.validate(addresses, path=path)
+        assert sorted(proxy["http"] for proxy in proxies) == sorted(f"http://{address}" for address in addresses[:2])
+
+        with open(path, encoding="utf8") as f:
+            setting = json.load(f)
+        # 依延遲排序
+        assert setting["http"] == [proxy["http"] for proxy in proxies]
+        assert sorted(setting["latency"], key=setting["latency"].get) == setting["http"]
+        assert obj.get() == proxies
@@ -0,0 +1,111 @@
+import datetime
+import threading
+import time
+
+import pytest
+import requests
+
+from src import client
+from src import scheduler
+from src.box.retry import RetryPolicy
+
+
+@pytest.mark.run(order=3)
+class TestProxyScheduler:
+    def test_run(self, monkeypatch):
+        proxies = [{"http": f"http://10.0.0.{i}:80"} for i in range(3)]
+        used, running, peak = [], [0], [0]
+        lock = threading.Lock()
+
+        def fetch(self, year, month, day):
+            with lock:
+                used.append(self.twse.get_proxy()["http"])
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+            return [{"date": f"{year}{month:0>2}{day:0>2}"}]
+
+        monkeypatch.setattr(client.TaiwanStockClient, "fetch", fetch)
+        dates = [datetime.date(2020, 1, d) for d in range(1, 10)]
+        results = list(scheduler.ProxyScheduler(client.TaiwanStockClient(), proxies).run(dates))
+
+        # 依日期順序回傳，各 proxy 平行抓取
+        assert [date for date, rawdata in results] == dates
+        assert [rawdata[0]["date"] for date, rawdata in results] == [d.strftime("%Y%m%d") for d in dates]
+        assert set(used) == {proxy["http"] for proxy in proxies}
+        assert peak[0] == 3
+
+    def test_failover(self, monkeypatch):
+        proxies = [{"http": f"http://10.0.0.{i}:80"} for i in range(3)]
+        used = []
+
+        def fetch(self, year, month, day):
+            proxy = self.twse.get_proxy()["http"]
+            if proxy == proxies[0]["http"]:
+                raise requests.exceptions.ProxyError("proxy is dead")
+            used.append(proxy)
+            time.sleep(0.01)
+            return [{"date": f"{year}{month:0>2}{day:0>2}"}]
+
+        monkeypatch.setattr(client.TaiwanStockClient, "fetch", fetch)
+        dates = [datetime.date(2020, 1, d) for d in range(1, 10)]
+        obj = scheduler.ProxyScheduler(
+            client.TaiwanStockClient(), proxies, workers_per_proxy=2, retry_policy=RetryPolicy(backoff_factor=0)
+        )
+        results = list(obj.run(dates))
+
+        # 失敗的 proxy 不再使用，其交易日改由其他 proxy 抓取
+        assert [date for date, rawdata in results] == dates
+        assert len(used) == len(dates)
+        assert proxies[0]["http"] not in used
+
+    def test_backoff(self, monkeypatch):
+        proxies = [{"http": f"http://10.0.0.{i}:80"} for i in range(2)]
+        used, failed = [], []
+
+        def fetch(self, year, month, day):
+            proxy = self.twse.get_proxy()["http"]
+            if proxy == proxies[0]["http"] and not failed:
+                failed.append(proxy)
+                raise requests.exceptions.ConnectTimeout("connect timeout")
+            used.append(proxy)
+            time.sleep(0.05)
+            return [{"date": f"{year}{month:0>2}{day:0>2}"}]
+
+        monkeypatch.setattr(client.TaiwanStockClient, "fetch", fetch)
+        dates = [datetime.date(2020, 1, d) for d in range(1, 10)]
+        obj = scheduler.ProxyScheduler(
+            client.TaiwanStockClient(), proxies, retry_policy=RetryPolicy(backoff_factor=0.01)
+        )
+        results = list(obj.run(dates))
+
+        # 暫時失敗的 proxy 等待後放回繼續使用
+        assert [date for date, rawdata in results] == dates
+        assert proxies[0]["http"] in used
+        assert not obj._retired
+
+    def test_data_error(self, monkeypatch):
+        def fetch(self, year, month, day):
+            raise ConnectionError("get data is empty")
+
+        monkeypatch.setattr(client.TaiwanStockClient, "fetch", fetch)
+        proxies = [{"http": f"http://10.0.0.{i}:80"} for i in range(2)]
+        obj = scheduler.ProxyScheduler(client.TaiwanStockClient(), proxies)
+
+        # 資料錯誤與 proxy 無關，直接 raise 且不停用 proxy
+        with pytest.raises(ConnectionError, match="get data is empty"):
+            list(obj.run([datetime.date(2020, 1, 1)]))
+        assert not obj._retired and not obj._failures
+
+    def test_all_failed(self, monkeypatch):
+        def fetch(self, year, month, day):
+            raise requests.exceptions.ProxyError("proxy is dead")
+
+        monkeypatch.setattr(client.TaiwanStockClient, "fetch", fetch)
+        proxies = [{"http": f"http://10.0.0.{i}:80"} for i in range(2)]
+        dates = [datetime.date(2020, 1, d) for d in range(1, 5)]
+        obj = scheduler.ProxyScheduler(client.TaiwanStockClient(), proxies, retry_policy=RetryPolicy(backoff_factor=0))
+        with pytest.raises(ConnectionError, match="all proxies failed"):
+            list(obj.run(dates))
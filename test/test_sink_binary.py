@@ -0,0 +1,82 @@
+import datetime
+import json
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.sink import binary  # noqa: E402
+
+
+@pytest.mark.run(order=2)
+class TestBinarySink:
+    PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "testdata", "20180115.json")
+
+    def rawdata(self, date, close):
+        return [
+            {"date": date, "category": 1, "sid": "2330", "name": "台積電", "close": close, "capacity": "1000"},
+            {"date": date, "category": 2, "sid": "6488", "name": "環球晶", "close": "X", "capacity": None},
+        ]
+
+    def test_write(self, tmp_path):
+        directory = str(tmp_path)
+        with binary.BinarySink(directory) as sink:
+            sink.write("20200102", self.rawdata("20200102", "300.00"))
+            sink.write("20200103", self.rawdata("20200103", "301.00"))
+        with binary.BinarySink(directory) as sink:
+            # 已存在的日期略過
+            assert sink.write("20200103", self.rawdata("20200103", "999.00")) == ["20200103"]
+            sink.write("20200106", self.rawdata("20200106", "302.00"))
+
+        store = binary.PriceStore(directory)
+        assert isinstance(store.records, np.memmap)
+        assert len(store.records) == 6
+        assert store.sids == ["2330", "6488"]
+
+        records = store.get("2330", start=datetime.date(2020, 1, 3))
+        assert records["date"].tolist() == [20200103, 20200106]
+        assert records["close"].tolist() == [301.0, 302.0]
+        assert records["capacity"].tolist() == [1000, 1000]
+        assert np.isnan(store.get("6488")["close"]).all()
+        assert len(store.get("0050")) == 0
+
+    def test_write_out_of_order(self, tmp_path):
+        directory = str(tmp_path)
+        with binary.BinarySink(directory) as sink:
+            sink.write("20200106", self.rawdata("20200106", "302.00"))
+            # 早於最後一日的資料無法附加，不可回報為已寫入
+            with pytest.raises(ValueError):
+                sink.write("20200103", self.rawdata("20200103", "301.00"))
+        assert binary.PriceStore(directory).get("2330")["date"].tolist() == [20200106]
+
+    def test_write_testdata(self, tmp_path):
+        with open(self.PATH, encoding="utf8") as f:
+            rawdata = list(json.load(f).values())
+        # 無法轉換的數值存為 NaN
+        rawdata[0] = dict(rawdata[0], margin_sales="OX")
+
+        directory = str(tmp_path)
+        with binary.BinarySink(directory) as sink:
+            assert sink.write("20180115", rawdata) == ["20180115"]
+
+        store = binary.PriceStore(directory)
+        assert len(store.records) == len(rawdata)
+        assert np.isnan(store.get(rawdata[0]["sid"])["margin_sales"][0])
+        assert store.get("2330")["close"].tolist() == [240.0]
+
+    def test_stale_index(self, tmp_path):
+        directory = str(tmp_path)
+        with binary.BinarySink(directory) as sink:
+            sink.write("20200102", self.rawdata("20200102", "300.00"))
+
+        # 不完整的 record 及未更新的索引
+        sink = binary.BinarySink(directory)
+        sink.write("20200103", self.rawdata("20200103", "301.00"))
+        sink._file.write(b"\x00" * 10)
+        sink._file.close()
+        assert binary.PriceStore(directory).get("2330", end="20200103")["close"].tolist() == [300.0, 301.0]
+
+        sink = binary.BinarySink(directory)
+        assert os.path.getsize(sink.path) % sink.dtype.itemsize == 0
+        assert sink.get_last_date() == 20200103
@@ -0,0 +1,63 @@
+import csv
+import gzip
+import json
+
+import pytest
+
+from src.sink import file
+
+
+@pytest.mark.run(order=2)
+class TestFileSink:
+    def rawdata(self, date):
+        yield {"date": date, "sid": "2330", "close": "300.00"}
+        yield {"date": date, "sid": "2454", "close": None}
+
+    def test_csv(self, tmp_path):
+        sink = file.CSVSink(str(tmp_path / "{date}.csv"))
+        assert sink.write("20200102", self.rawdata("20200102")) == ["20200102"]
+        with open(tmp_path / "20200102.csv", encoding="utf8") as f:
+            assert [row["sid"] for row in csv.DictReader(f)] == ["2330", "2454"]
+
+        # 沒有資料時不建立檔案
+        assert sink.write("20200103", iter([])) == []
+        assert not (tmp_path / "20200103.csv").exists()
+
+    def test_csv_failed(self, tmp_path):
+        def rawdata():
+            yield from self.rawdata("20200102")
+            raise ConnectionError("tpex failed")
+
+        # 中途失敗時不留下不完整的檔案
+        sink = file.CSVSink(str(tmp_path / "{date}.csv"))
+        with pytest.raises(ConnectionError):
+            sink.write("20200102", rawdata())
+        assert list(tmp_path.iterdir()) == []
+
+    def test_json(self, tmp_path):
+        sink = file.JSONSink(str(tmp_path / "{date}.json"))
+        assert sink.write("20200102", list(self.rawdata("20200102"))) == ["20200102"]
+        with open(tmp_path / "20200102.json", encoding="utf8") as f:
+            assert list(json.load(f)) == ["2330", "2454"]
+        with pytest.raises(TypeError):
+            file.FileSink()
+
+    def test_ndjson_gzip(self, tmp_path):
+        sink = file.NDJSONSink(str(tmp_path / "{date}.ndjson.gz"), compress=True)
+        sink.write("20200102", self.rawdata("20200102"))
+        with gzip.open(tmp_path / "20200102.ndjson.gz", "rt", encoding="utf8") as f:
+            assert [json.loads(line) for line in f] == list(self.rawdata("20200102"))
+
+    @pytest.mark.parametrize("compress", [False, True])
+    def test_csv_append(self, tmp_path, compress):
+        path = str(tmp_path / "stock.csv")
+        with file.CSVSink(path, compress=compress, append=True) as sink:
+            sink.write("20200102", self.rawdata("20200102"))
+            sink.write("20200103", self.rawdata("20200103"))
+        with file.CSVSink(path, compress=compress, append=True) as sink:
+            sink.write("20200106", self.rawdata("20200106"))
+
+        with gzip.open(path, "rt", encoding="utf8") if compress else open(path, encoding="utf8") as f:
+            rows = list(csv.DictReader(f))
+        # 僅於檔案開頭寫入一次標題
+        assert [row["date"] for row in rows] == ["20200102", "20200102", "20200103", "20200103", "20200106", "20200106"]
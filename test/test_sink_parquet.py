@@ -0,0 +1,63 @@
+import json
+import os
+
+import pytest
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+from src.sink import parquet  # noqa: E402
+
+
+@pytest.mark.run(order=2)
+class TestParquetSink:
+    PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "testdata", "20180115.json")
+
+    def rawdata(self, date, close):
+        return [
+            {"date": date, "category": 1, "sid": "2330", "name": "台積電", "close": close, "capacity": "1000"},
+            {"date": date, "category": 2, "sid": "6488", "name": "環球晶", "close": "X", "capacity": None},
+        ]
+
+    def test_write(self, tmp_path):
+        sink = parquet.ParquetSink(str(tmp_path))
+        assert sink.write("20200130", self.rawdata("20200130", "300.00")) == []
+        assert sink.write("20200131", self.rawdata("20200131", "301.00")) == []
+        # 換月時寫入上個月
+        assert sink.write("20200203", self.rawdata("20200203", "302.00")) == ["20200130", "20200131"]
+        assert sink.close() == ["20200203"]
+
+        table = pq.read_table(sink.get_path("202001", 1))
+        assert table.column("close").to_pylist() == [300.0, 301.0]
+        assert table.column("capacity").to_pylist() == [1000, 1000]
+        assert pq.read_table(sink.get_path("202001", 2)).column("close").to_pylist() == [None, None]
+
+        table = pq.read_table(str(tmp_path), columns=["date", "close", "category"])
+        assert table.num_rows == 6
+        assert sorted(table.column("category").to_pylist()) == [1, 1, 1, 2, 2, 2]
+
+    def test_append(self, tmp_path):
+        with parquet.ParquetSink(str(tmp_path)) as sink:
+            sink.write("20200130", self.rawdata("20200130", "300.00"))
+        with parquet.ParquetSink(str(tmp_path)) as sink:
+            sink.write("20200130", self.rawdata("20200130", "310.00"))
+            sink.write("20200131", self.rawdata("20200131", "301.00"))
+
+        table = pq.read_table(sink.get_path("202001", 1))
+        assert table.column("date").to_pylist() == ["20200130", "20200131"]
+        assert table.column("close").to_pylist() == [310.0, 301.0]
+
+    def test_write_testdata(self, tmp_path):
+        with open(self.PATH, encoding="utf8") as f:
+            rawdata = list(json.load(f).values())
+        # 無法轉換的數值寫入 null，不使整個月份寫入失敗
+        rawdata[0] = dict(rawdata[0], margin_sales="OX")
+
+        with parquet.ParquetSink(str(tmp_path)) as sink:
+            sink.write("20180115", rawdata)
+
+        table = pq.read_table(str(tmp_path), columns=["sid", "close", "margin_sales", "note"])
+        assert table.num_rows == len(rawdata)
+        rows = {row["sid"]: row for row in table.to_pylist()}
+        assert rows[rawdata[0]["sid"]]["margin_sales"] is None
+        assert rows["2330"]["close"] == 240.0
+        assert "OX" in {row["note"] for row in rows.values()}
@@ -0,0 +1,206 @@
+import csv
+import json
+import os
+import re
+
+import peewee
+import pytest
+
+from src.orm import models
+from src.orm import SQLFactory
+from src.sink import sql
+
+
+@pytest.mark.run(order=2)
+class TestSQLSink:
+    def setup(self):
+        sql._STOCK_NAMES.clear()
+        sql._SCHEMAS.clear()
+        self.db = peewee.SqliteDatabase(":memory:")
+        self.obj = sql.SQLSink(self.db)
+
+    def rawdata(self, date, name):
+        return [
+            {"date": date, "category": 1, "sid": "2330", "name": name, "close": "300.00"},
+            {"date": date, "category": 1, "sid": "2454", "name": "聯發科", "close": "100.00"},
+        ]
+
+    def test_write(self):
+        self.obj.write("20200102", self.rawdata("20200102", "台積電"))
+        self.obj.write("20200103", self.rawdata("20200103", "台積電公司"))
+        self.obj.write("20200103", self.rawdata("20200103", "台積電公司"))
+
+        assert dict(models.StockInfo.select().tuples()) == {"2330": "台積電公司", "2454": "聯發科"}
+        assert models.StockMarket.select().count() == 4
+
+    def test_unchanged_names_skipped(self):
+        self.obj.write("20200102", self.rawdata("20200102", "台積電"))
+        models.StockInfo.delete().execute()
+
+        # 名稱未變動，不再寫入 StockInfo
+        self.obj.write("20200103", self.rawdata("20200103", "台積電"))
+        assert models.StockInfo.select().count() == 0
+
+    def test_batch_size(self):
+        assert self.obj.get_batch_size(self.rawdata("20200102", "台積電")) == 999 // 5
+        assert sql.SQLSink(self.db, batch_size=1).get_batch_size([]) == 1
+
+        obj = sql.SQLSink(self.db, batch_size=1)
+        assert obj.write("20200102", self.rawdata("20200102", "台積電")) == ["20200102"]
+        assert models.StockMarket.select().count() == 2
+
+    def test_days_per_transaction(self):
+        obj = sql.SQLSink(self.db, days_per_transaction=2)
+        assert obj.write("20200102", self.rawdata("20200102", "台積電")) == []
+        assert obj.write("20200103", self.rawdata("20200103", "台積電")) == ["20200102", "20200103"]
+        assert obj.write("20200106", self.rawdata("20200106", "台積電")) == []
+        assert obj.close() == ["20200106"]
+        assert obj.close() == []
+        assert models.StockMarket.select().count() == 6
+
+    def test_rollback(self):
+        obj = sql.SQLSink(self.db, days_per_transaction=2)
+        obj.write("20200102", self.rawdata("20200102", "台積電"))
+        with pytest.raises(KeyError):
+            obj.write("20200103", [{"date": "20200103", "category": 1}])
+
+        # 同一 transaction 內先前的日期一併回復，未列入已完成
+        assert obj.close() == []
+        assert models.StockMarket.select().count() == 0
+        assert "2330" not in obj.stock_names
+
+    def test_defer_index(self, monkeypatch):
+        self.obj.write("20200102", self.rawdata("20200102", "台積電"))
+
+        obj = sql.SQLSink(self.db, defer_index=True)
+        assert [index.name for index in self.db.get_indexes("stockmarket")] == ["stockmarket_stock_id_date"]
+
+        statements = []
+        execute_sql = self.db.execute_sql
+
+        def record(sql, params=None, *args, **kwargs):
+            statements.append((sql, params))
+            return execute_sql(sql, params, *args, **kwargs)
+
+        monkeypatch.setattr(self.db, "execute_sql", record)
+        obj.write("20200102", self.rawdata("20200102", "台積電")[:1])
+        obj.write("20200103", self.rawdata("20200103", "台積電"))
+        obj.close()
+
+        # 已存在的日期經由唯一索引刪除，不掃描資料表
+        deletes = [(sql, params) for sql, params in statements if sql.startswith("DELETE")]
+        assert len(deletes) == 1
+        plan = execute_sql("EXPLAIN QUERY PLAN " + deletes[0][0], deletes[0][1]).fetchall()
+        assert "USING INDEX stockmarket_stock_id_date" in plan[0][-1]
+
+        assert "stockmarket_date" in [index.name for index in self.db.get_indexes("stockmarket")]
+        assert models.StockMarket.select().count() == 3
+
+    def test_fast_load(self, tmp_path):
+        db = SQLFactory.sqlite(str(tmp_path / "sqlite.db"), fast_load=True)
+        assert db.journal_mode == "wal"
+        assert db.synchronous == 1
+        assert db.pragma("temp_store") == 2
+
+    def test_upsert(self):
+        self.obj.write("20200102", self.rawdata("20200102", "台積電"))
+        rawdata = self.rawdata("20200102", "台積電")
+        rawdata[0]["close"] = "301.00"
+        self.obj.write("20200102", rawdata)
+
+        assert models.StockMarket.select().count() == 2
+        assert models.StockMarket.get(models.StockMarket.stock == "2330").close == 301.0
+
+    def test_stale_rows(self):
+        self.obj.write("20200102", self.rawdata("20200102", "台積電"))
+        self.obj.write("20200103", self.rawdata("20200103", "台積電"))
+
+        # 重抓的資料已不含 2454，不可殘留舊資料
+        self.obj.write("20200102", self.rawdata("20200102", "台積電")[:1])
+        assert models.StockMarket.select().where(models.StockMarket.date == "20200102").count() == 1
+        sql.SQLSink(self.db).write("20200103", self.rawdata("20200103", "台積電")[1:])
+        assert [row.stock_id for row in models.StockMarket.select()] == ["2330", "2454"]
+
+    def test_destination(self, tmp_path):
+        assert self.obj.destination == "sqlitedatabase:///:memory:"
+        databases = [SQLFactory.sqlite(str(tmp_path / name)) for name in ("a.db", "b.db")]
+        assert sql.SQLSink(databases[0]).destination != sql.SQLSink(databases[1]).destination
+
+    def test_schema_ensured(self, monkeypatch):
+        monkeypatch.setattr(sql.migrate, "create_tables", lambda: pytest.fail("DDL executed again"))
+        sql.SQLSink(self.db)
+
+
+@pytest.mark.run(order=2)
+class TestCopyBuffer:
+    PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "testdata", "20180115.json")
+
+    def test_credit_transactions(self):
+        with open(self.PATH, encoding="utf8") as f:
+            rawdata = list(json.load(f).values())
+        rows = []
+        for row in rawdata:
+            row = dict(row)
+            row["stock_id"] = row.pop("sid")
+            row.pop("name")
+            rows += [row]
+        rows[0]["margin_sales"] = "OX"
+
+        columns = list(rows[0])
+        buffer = sql.get_copy_buffer(models.StockMarket, columns, rows)
+        copied = [dict(zip(columns, values)) for values in csv.reader(buffer)]
+        assert len(copied) == len(rows)
+
+        # 融資融券註記為文字 (StockMarket.note 為文字欄位)
+        assert isinstance(models.StockMarket.note, peewee.CharField)
+        assert {"OX", "@", "X", ""} <= {row["note"] for row in copied}
+
+        # 數值欄位依型別轉換，無法轉換者為 NULL (空欄位)
+        tsmc = next(row for row in copied if row["stock_id"] == "2330")
+        assert (tsmc["close"], tsmc["capacity"]) == ("240.0", "28576533")
+        assert copied[0]["margin_sales"] == ""
+        numeric = [
+            field.column_name
+            for field in models.StockMarket._meta.sorted_fields
+            if isinstance(field, (peewee.IntegerField, peewee.FloatField)) and field.column_name in columns
+        ]
+        invalid = [(row["stock_id"], name, row[name]) for row in copied for name in numeric]
+        assert [item for item in invalid if not re.fullmatch(r"(-?\d+(\.\d+)?)?", item[2])] == []
+
+
+# 需本機 PostgreSQL，例如 POSTGRES_HOST=localhost POSTGRES_USER=postgres POSTGRES_PASSWORD=postgres POSTGRES_DB=stock
+@pytest.mark.run(order=2)
+@pytest.mark.skipif("POSTGRES_HOST" not in os.environ, reason="PostgreSQL is not configured")
+class TestPostgreSQLSink:
+    def setup(self):
+        pytest.importorskip("psycopg2")
+        sql._STOCK_NAMES.clear()
+        sql._SCHEMAS.clear()
+        self.db = SQLFactory.postgresql(
+            database_name=os.environ.get("POSTGRES_DB", "postgres"),
+            host=os.environ["POSTGRES_HOST"],
+            user=os.environ.get("POSTGRES_USER", "postgres"),
+            password=os.environ.get("POSTGRES_PASSWORD"),
+            port=int(os.environ.get("POSTGRES_PORT", 5432)),
+        )
+        models.StockInfo.bind(self.db)
+        models.StockMarket.bind(self.db)
+        self.db.drop_tables([models.StockMarket, models.StockInfo])
+        self.obj = sql.PostgreSQLSink(self.db)
+
+    def teardown(self):
+        self.db.drop_tables([models.StockMarket, models.StockInfo])
+        self.db.close()
+
+    def test_write(self):
+        rawdata = TestSQLSink.rawdata(None, "20200102", "台積電")
+        rawdata[1]["close"] = None
+        assert self.obj.write("20200102", rawdata) == ["20200102"]
+
+        rawdata = TestSQLSink.rawdata(None, "20200102", "台積電")
+        rawdata[0]["close"] = "301.00"
+        self.obj.write("20200102", rawdata)
+
+        rows = models.StockMarket.select().order_by(models.StockMarket.stock)
+        assert [(row.stock_id, row.close) for row in rows] == [("2330", 301.0), ("2454", 100.0)]
+        assert dict(models.StockInfo.select().tuples()) == {"2330": "台積電", "2454": "聯發科"}